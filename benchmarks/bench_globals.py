@@ -0,0 +1,88 @@
+import argparse
+import random
+import re
+import timeit
+
+from yamlscript import ExpressionGlobals, sub
+from yamlscript import globals as expression_globals
+
+_VARIABLE = re.compile(r"\$\{(\w+)\}")
+
+CASES = {
+    "mean": (
+        "sum(${samples}) / sum(1 for _ in ${samples})",
+        "mean(${samples})",
+    ),
+    "sum_doubled": (
+        "sum(map(lambda x: x * 2, ${samples}))",
+        "sum(multiply(${samples}, 2))",
+    ),
+    "elementwise": (
+        "[a + b for a, b in zip(${samples}, ${samples})]",
+        "add(${samples}, ${samples})",
+    ),
+    "histogram": (
+        "[sum(1 for x in ${samples} if i / 10 <= x < (i + 1) / 10)"
+        " for i in [0, 1, 2, 3, 4, 5, 6, 7, 8, 9]]",
+        "histogram(${samples}, 10, (0, 1))['counts']",
+    ),
+    "group_sum": (
+        "{k: sum(r['v'] for r in ${records} if r['k'] == k) for k in 'abcd'}",
+        "group_sum(${records}, 'k', 'v')",
+    ),
+}
+
+
+class BuiltinGlobals(ExpressionGlobals):
+    __builtins__ = dict(ExpressionGlobals.__builtins__, zip=zip)
+
+
+def context(size: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    return {
+        "samples": [rng.random() for _ in range(size)],
+        "records": [{"k": rng.choice("abcd"), "v": rng.random()} for _ in range(size)],
+    }
+
+
+def measure(func, repeat: int) -> float:
+    return min(timeit.repeat(func, number=1, repeat=repeat))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare batched globals.")
+    parser.add_argument("--size", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    data = context(args.size, args.seed)
+    namespace = dict(BuiltinGlobals.namespace(), **data)
+    backend = "numpy" if expression_globals._numpy() else "python"
+    print(f"{args.size} samples, {backend} backend")
+    print(f"{'case':12} {'':8} {'builtin':>10} {'batched':>10} {'speedup':>8}")
+    for name, (builtin, batched) in CASES.items():
+        rows = {
+            "sub": [
+                measure(
+                    lambda: sub(f"$({source})", data, g=BuiltinGlobals), args.repeat
+                )
+                for source in (builtin, batched)
+            ],
+            "eval": [
+                measure(
+                    lambda: eval(_VARIABLE.sub(r"\1", source), namespace),
+                    args.repeat,
+                )
+                for source in (builtin, batched)
+            ],
+        }
+        for mode, (before, after) in rows.items():
+            print(
+                f"{name:12} {mode:8} {before * 1000:8.1f}ms {after * 1000:8.1f}ms"
+                f" {before / after:7.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
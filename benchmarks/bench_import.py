@@ -0,0 +1,38 @@
+import argparse
+import subprocess
+import sys
+import time
+
+COMMANDS = {
+    "python": [sys.executable, "-c", "pass"],
+    "import": [sys.executable, "-c", "import yamlscript"],
+    "import_load": [sys.executable, "-c", "from yamlscript import load, sub"],
+    "cli_help": [sys.executable, "-m", "yamlscript", "--help"],
+}
+
+
+def measure(command: list, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(command, check=True, stdout=subprocess.DEVNULL)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure yamlscript start-up time.")
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    baseline = measure(COMMANDS["python"], args.repeat)
+    print(f"{'python':12} {baseline * 1000:8.1f}ms")
+    for name, command in list(COMMANDS.items())[1:]:
+        seconds = measure(command, args.repeat)
+        print(
+            f"{name:12} {seconds * 1000:8.1f}ms  +{(seconds - baseline) * 1000:.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
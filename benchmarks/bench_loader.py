@@ -0,0 +1,51 @@
+import argparse
+import pathlib
+import tempfile
+import timeit
+
+import yaml
+
+from yamlscript import load
+
+
+def generate(path: pathlib.Path, keys: int) -> None:
+    document = {
+        f"key_{i}": {
+            "name": "${my_name}",
+            "index": i,
+            "tags": ["a", "b", "c"],
+            "enabled": i % 2 == 0,
+        }
+        for i in range(keys)
+    }
+    path.write_text(yaml.safe_dump(document))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare YAML loader speeds.")
+    parser.add_argument("--keys", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    loaders = {"SafeLoader": yaml.SafeLoader}
+    if hasattr(yaml, "CSafeLoader"):
+        loaders["CSafeLoader"] = yaml.CSafeLoader
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = pathlib.Path(directory) / "document.yaml"
+        generate(path, args.keys)
+        size = path.stat().st_size / 1024 / 1024
+        print(f"{args.keys} keys, {size:.1f} MB")
+        for name, loader in loaders.items():
+            seconds = min(
+                timeit.repeat(
+                    lambda: load(path, parse=False, loader=loader),
+                    number=1,
+                    repeat=args.repeat,
+                )
+            )
+            print(f"{name:12} {seconds:8.3f}s {size / seconds:8.2f} MB/s")
+
+
+if __name__ == "__main__":
+    main()
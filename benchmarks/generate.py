@@ -0,0 +1,74 @@
+import random
+from typing import Any, Dict, List
+
+CONTEXT_SIZE = 100
+
+EXPRESSIONS = (
+    "$(${numbers.%(i)d} * 2)",
+    "$(str(${numbers.%(i)d}) + '-' + '${values.k%(i)d}')",
+    "$([n + 1 for n in ${numbers}][%(i)d])",
+)
+
+
+def context() -> Dict[str, Any]:
+    return {
+        "values": {f"k{i}": f"value-{i}" for i in range(CONTEXT_SIZE)},
+        "numbers": list(range(CONTEXT_SIZE)),
+    }
+
+
+def _variable(i: int, defaults: int) -> str:
+    variable = "${values.k%d}" % i
+    for level in range(defaults):
+        variable = "${missing.m%d:%s}" % (level, variable)
+    return variable
+
+
+def _leaf(rng: random.Random, density: float, expressions: float, defaults: int) -> str:
+    i = rng.randrange(CONTEXT_SIZE)
+    if rng.random() >= density:
+        return f"literal string number {i}"
+    if rng.random() < expressions:
+        return rng.choice(EXPRESSIONS) % {"i": i}
+    return f"prefix {_variable(i, defaults)} suffix"
+
+
+def document(
+    size: int = 10000,
+    depth: int = 3,
+    density: float = 0.5,
+    expressions: float = 0.2,
+    defaults: int = 1,
+    seed: int = 0,
+) -> Any:
+    rng = random.Random(seed)
+    width = max(2, round(size ** (1 / depth)))
+
+    def _build(level: int, remaining: int) -> Any:
+        if level == depth or remaining <= width:
+            return {
+                f"key_{i}": _leaf(rng, density, expressions, defaults)
+                for i in range(remaining)
+            }
+        out: Dict[str, Any] = {}
+        per_child = max(1, remaining // width)
+        index = 0
+        while remaining > 0:
+            count = min(per_child, remaining)
+            child = _build(level + 1, count)
+            out[f"node_{index}"] = child if index % 2 else [child]
+            remaining -= count
+            index += 1
+        return out
+
+    return _build(1, size)
+
+
+def strings(obj: Any) -> List[str]:
+    if isinstance(obj, str):
+        return [obj]
+    if isinstance(obj, dict):
+        return [string for value in obj.values() for string in strings(value)]
+    if isinstance(obj, list):
+        return [string for value in obj for string in strings(value)]
+    return []
@@ -0,0 +1,160 @@
+import argparse
+import json
+import pathlib
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List
+
+import yaml
+
+import yamlscript
+
+from . import generate
+
+ROOT = pathlib.Path(__file__).parent.parent.absolute()
+
+
+def _measure(func: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        seconds.append(time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"seconds": min(seconds), "peak_memory": peak}
+
+
+def _cli(path: pathlib.Path, context: Dict[str, Any]) -> None:
+    subprocess.run(
+        [
+            sys.executable,
+            "-m",
+            "yamlscript",
+            str(path),
+            "--values",
+            json.dumps(context),
+        ],
+        cwd=ROOT,
+        check=True,
+        stdout=subprocess.DEVNULL,
+    )
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    document = generate.document(
+        args.size, args.depth, args.density, args.expressions, args.defaults, args.seed
+    )
+    context = generate.context()
+    count = len(generate.strings(document))
+    template = yamlscript.compile(document)
+
+    results: Dict[str, Any] = {}
+    with tempfile.TemporaryDirectory() as directory:
+        json_path = pathlib.Path(directory) / "document.json"
+        yaml_path = pathlib.Path(directory) / "document.yaml"
+        json_path.write_text(json.dumps(document))
+        yaml_path.write_text(yaml.safe_dump(document))
+        sizes = {
+            "sub": len(json.dumps(document)),
+            "compile": len(json.dumps(document)),
+            "render": len(json.dumps(document)),
+            "load_json": json_path.stat().st_size,
+            "load_yaml": yaml_path.stat().st_size,
+            "cli": json_path.stat().st_size,
+        }
+        benchmarks: Dict[str, Callable[[], Any]] = {
+            "sub": lambda: yamlscript.sub(document, context),
+            "compile": lambda: yamlscript.compile(document),
+            "render": lambda: template.render(context),
+            "load_json": lambda: yamlscript.load(json_path, context=context),
+            "load_yaml": lambda: yamlscript.load(yaml_path, context=context),
+            "cli": lambda: _cli(json_path, context),
+        }
+        for name, func in benchmarks.items():
+            if args.only and name not in args.only:
+                continue
+            result = _measure(func, args.repeat)
+            result["strings_per_second"] = count / result["seconds"]
+            result["mb_per_second"] = sizes[name] / 1024 / 1024 / result["seconds"]
+            results[name] = result
+            print(
+                f"{name:10} {result['seconds']:8.3f}s "
+                f"{result['strings_per_second']:12.0f} strings/s "
+                f"{result['mb_per_second']:8.2f} MB/s "
+                f"{result['peak_memory'] / 1024 / 1024:8.1f} MB peak",
+                file=sys.stderr,
+            )
+
+    return {
+        "python": platform.python_version(),
+        "parameters": {
+            "size": args.size,
+            "depth": args.depth,
+            "density": args.density,
+            "expressions": args.expressions,
+            "defaults": args.defaults,
+            "seed": args.seed,
+            "strings": count,
+        },
+        "results": results,
+    }
+
+
+def compare(
+    results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float
+) -> List[str]:
+    regressions = []
+    for name, result in results["results"].items():
+        if name not in baseline["results"]:
+            continue
+        expected = baseline["results"][name]["strings_per_second"]
+        ratio = result["strings_per_second"] / expected
+        if ratio < 1 - tolerance:
+            regressions.append(f"{name}: {ratio:.2f}x of baseline throughput")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the yamlscript benchmarks.")
+    parser.add_argument("--size", type=int, default=10000, help="strings per document")
+    parser.add_argument("--depth", type=int, default=3, help="mapping nesting depth")
+    parser.add_argument("--density", type=float, default=0.5, help="templated ratio")
+    parser.add_argument(
+        "--expressions", type=float, default=0.2, help="expression ratio"
+    )
+    parser.add_argument("--defaults", type=int, default=1, help="nested defaults")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--only", nargs="*", help="benchmark names to run")
+    parser.add_argument("--output", type=pathlib.Path, help="write results JSON here")
+    parser.add_argument("--baseline", type=pathlib.Path, help="compare with results")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    results = run(args)
+    output = json.dumps(results, indent=2)
+    if args.output:
+        args.output.write_text(output)
+    else:
+        print(output)
+    if args.baseline:
+        regressions = compare(
+            results, json.loads(args.baseline.read_text()), args.tolerance
+        )
+        for regression in regressions:
+            print(f"regression: {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
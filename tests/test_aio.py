@@ -0,0 +1,57 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import pytest
+
+from yamlscript import Registry, aload, aload_many, load
+
+from .conftest import TEST_FILES_DIR
+from .test_load import EXPECTED, UNPARSED
+
+
+@pytest.mark.parametrize(
+    "path,kwargs,expected",
+    [
+        (TEST_FILES_DIR / "json_format.json", {}, EXPECTED),
+        (TEST_FILES_DIR / "yaml_format.yaml", {"parse": False}, UNPARSED),
+        (TEST_FILES_DIR / "anonymous_format", {"file_type": "yaml"}, EXPECTED),
+        (TEST_FILES_DIR / "anonymous_format", {"file_type": "nope"}, NotImplementedError),
+        (TEST_FILES_DIR / "anonymous_format", {}, Exception),
+    ],
+)
+def test_aload(path, kwargs, expected, context):
+    if isinstance(expected, type) and issubclass(expected, Exception):
+        with pytest.raises(expected):
+            asyncio.run(aload(path, context=context, **kwargs))
+    else:
+        assert asyncio.run(aload(path, context=context, **kwargs)) == expected
+
+
+@pytest.mark.parametrize("executor_type", [None, ThreadPoolExecutor, ProcessPoolExecutor])
+def test_aload_many(executor_type, context):
+    names = ("json_format.json", "yaml_format.yaml", "yaml_format.yml")
+    paths = [TEST_FILES_DIR / name for name in names] * 3
+    executor = executor_type(2) if executor_type else None
+    try:
+        output = asyncio.run(aload_many(paths, context=context, executor=executor, limit=2))
+    finally:
+        if executor:
+            executor.shutdown()
+    assert output == [load(path, context=context) for path in paths]
+
+
+def test_aload_many_error(context):
+    paths = [TEST_FILES_DIR / "json_format.json", TEST_FILES_DIR / "anonymous_format"]
+    with pytest.raises(Exception):
+        asyncio.run(aload_many(paths, context=context))
+
+
+def test_aload_many_kwargs(context, tmp_path):
+    names = ("json_format.json", "yaml_format.yaml", "yaml_format.yml")
+    paths = [TEST_FILES_DIR / name for name in names] * 3
+    registry = Registry()
+    output = asyncio.run(aload_many(paths, context=context, registry=registry, limit=1))
+    assert output == [load(path, context=context) for path in paths]
+    assert registry.reads == len(names)
+    assert asyncio.run(aload(paths[0], context=context, cache=tmp_path)) == EXPECTED
+    assert list(tmp_path.iterdir())
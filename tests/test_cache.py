@@ -0,0 +1,111 @@
+import os
+
+import pytest
+
+from yamlscript import RenderCache, load
+
+from .conftest import TEST_FILES_DIR
+from .test_load import EXPECTED
+
+TEMPLATE = (TEST_FILES_DIR / "yaml_format.yaml").read_text()
+
+
+@pytest.fixture
+def template(tmp_path):
+    path = tmp_path / "template.yaml"
+    path.write_text(TEMPLATE)
+    return path
+
+
+def test_cache_rendered(template, context, tmp_path):
+    cache = RenderCache(tmp_path / "cache")
+    assert load(template, context=context, cache=cache) == EXPECTED
+    assert (cache.hits, cache.misses) == (0, 2)
+    assert load(template, context=context, cache=cache) == EXPECTED
+    assert (cache.hits, cache.misses) == (2, 2)
+
+
+def test_cache_directory(template, context, tmp_path):
+    assert load(template, context=context, cache=tmp_path / "cache") == EXPECTED
+    assert load(template, context=context, cache=str(tmp_path / "cache")) == EXPECTED
+    assert len(list((tmp_path / "cache").glob("*.pickle"))) == 2
+
+
+def test_cache_context_and_file_changes(template, context, tmp_path):
+    cache = RenderCache(tmp_path / "cache")
+    load(template, context=context, cache=cache)
+    output = load(template, context=dict(context), values={"my_name": "Mike"}, cache=cache)
+    assert output["name"] == "Mike"
+    template.write_text("name: ${my_int}\n")
+    assert load(template, context={"my_int": 1}, cache=cache) == {"name": 1}
+
+
+def test_cache_parsed_only(template, context, tmp_path):
+    cache = RenderCache(tmp_path / "cache", rendered=False)
+    load(template, context=context, cache=cache)
+    assert load(template, context=context, cache=cache) == EXPECTED
+    assert load(template, parse=False, cache=cache)["name"] == "${my_name}"
+    assert len(list((tmp_path / "cache").glob("*.pickle"))) == 1
+
+
+@pytest.mark.parametrize("text", ["id: $(uuid())", "when: $(str(now()))", "day: $(today())"])
+def test_cache_skips_nondeterministic(text, tmp_path):
+    path = tmp_path / "template.yaml"
+    path.write_text(text)
+    cache = RenderCache(tmp_path / "cache")
+    load(path, cache=cache)
+    load(path, cache=cache)
+    assert len(list((tmp_path / "cache").glob("*.pickle"))) == 1
+    assert cache.hits == 1
+
+
+def test_cache_skips_nondeterministic_context(template, context, tmp_path):
+    cache = RenderCache(tmp_path / "cache")
+    load(template, context=dict(context), values={"my_name": "$(uuid())"}, cache=cache)
+    assert len(list((tmp_path / "cache").glob("*.pickle"))) == 1
+
+
+def test_cache_eviction(tmp_path, context):
+    cache = RenderCache(tmp_path / "cache", max_size=1)
+    for i in range(3):
+        path = tmp_path / f"template_{i}.yaml"
+        path.write_text(TEMPLATE)
+        assert load(path, context=context, cache=cache) == EXPECTED
+    assert cache.size() <= 1
+
+
+def test_cache_unclosed_expression(tmp_path):
+    path = tmp_path / "template.yaml"
+    path.write_text("a: $(1 + 2")
+    assert load(path, parse=False, cache=tmp_path / "cache") == load(path, parse=False) == {"a": "$(1 + 2"}
+    with pytest.raises(ValueError):
+        load(path, cache=tmp_path / "cache")
+
+
+def test_cache_unpicklable_result(tmp_path):
+    path = tmp_path / "template.yaml"
+    path.write_text("f: '$(lambda x: x)'\n")
+    output = load(path, cache=tmp_path / "cache")
+    assert output["f"](1) == 1
+    assert [entry.suffix for entry in (tmp_path / "cache").iterdir()] == [".pickle"]
+
+
+def test_cache_entries_removed_concurrently(tmp_path, monkeypatch):
+    class RacingPath(type(tmp_path)):
+        def glob(self, pattern):
+            yield self / "removed.pickle"
+            yield from super().glob(pattern)
+
+    def utime(path):
+        raise FileNotFoundError(path)
+
+    cache = RenderCache(RacingPath(tmp_path / "cache"), max_size=0)
+    cache.set("a", 1)
+    cache.max_size = 1024
+    cache.set("a", 1)
+    monkeypatch.setattr(os, "utime", utime)
+    assert cache.get("a") == 1
+    monkeypatch.undo()
+    assert cache.size() > 0
+    cache.clear()
+    assert cache.size() == 0
@@ -0,0 +1,92 @@
+import copy
+import io
+import json
+
+import pytest
+
+from yamlscript import load
+from yamlscript.cli import main, yamlscript
+
+from .conftest import TEST_FILES_DIR
+from .test_load import EXPECTED
+
+
+def _records(capsys):
+    return sorted(
+        (json.loads(line) for line in capsys.readouterr().out.splitlines()),
+        key=lambda record: record["path"],
+    )
+
+
+def test_cli_single(context):
+    assert json.loads(yamlscript(TEST_FILES_DIR / "yaml_format.yaml", values=context)) == EXPECTED
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_cli_batch(workers, context, capsys):
+    paths = [TEST_FILES_DIR / "json_format.json", TEST_FILES_DIR / "missing.yaml"]
+    assert yamlscript(*paths, values=context, workers=workers) is None
+    assert _records(capsys) == [
+        {"path": str(TEST_FILES_DIR / "json_format.json"), "result": EXPECTED},
+        {"path": str(TEST_FILES_DIR / "missing.yaml"), "error": {"type": "Exception", "message": ""}},
+    ]
+
+
+def test_cli_batch_glob(context, capsys):
+    yamlscript(TEST_FILES_DIR / "yaml_format.*", values=context)
+    assert _records(capsys) == [
+        {"path": str(TEST_FILES_DIR / "yaml_format.yaml"), "result": EXPECTED},
+        {"path": str(TEST_FILES_DIR / "yaml_format.yml"), "result": EXPECTED},
+    ]
+
+
+def test_cli_batch_stdin(context, capsys, monkeypatch):
+    monkeypatch.setattr("sys.stdin", io.StringIO(f"{TEST_FILES_DIR / 'json_format.json'}\n\n"))
+    yamlscript(values=context, stdin=True, no_parse=True)
+    records = _records(capsys)
+    assert [record["result"]["name"] for record in records] == ["${my_name}"]
+
+
+def test_cli_batch_error_types(context, capsys):
+    yamlscript(TEST_FILES_DIR / "anonymous_format", TEST_FILES_DIR / "json_format.json", file_type="nope")
+    assert [record["error"]["type"] for record in _records(capsys)] == ["NotImplementedError"] * 2
+
+
+def test_cli_main(context, capsys):
+    main([str(TEST_FILES_DIR / "yaml_format.yaml"), "--values", json.dumps(context), "--file-type", "yaml"])
+    assert json.loads(capsys.readouterr().out) == EXPECTED
+
+
+@pytest.mark.parametrize("no_parse", [False, True])
+def test_cli_output(no_parse, context, tmp_path):
+    path = tmp_path / "out.json"
+    assert yamlscript(TEST_FILES_DIR / "yaml_format.yaml", values=context, no_parse=no_parse, output=str(path)) is None
+    expected = yamlscript(TEST_FILES_DIR / "yaml_format.yaml", values=context, no_parse=no_parse)
+    assert path.read_text() == expected + "\n"
+
+
+def test_cli_batch_output(context, tmp_path):
+    path = tmp_path / "out.ndjson"
+    main([str(TEST_FILES_DIR / "yaml_format.*"), "--values", json.dumps(context), "-o", str(path)])
+    assert [json.loads(line)["result"] for line in path.read_text().splitlines()] == [EXPECTED, EXPECTED]
+
+
+def test_cli_include(context, tmp_path):
+    expected = load(TEST_FILES_DIR / "includes" / "main.yaml", copy.deepcopy(context))
+    assert json.loads(yamlscript(TEST_FILES_DIR / "includes" / "main.yaml", values=copy.deepcopy(context))) == expected
+    path = tmp_path / "out.json"
+    main([str(TEST_FILES_DIR / "includes" / "main.yaml"), "--values", json.dumps(context), "-o", str(path)])
+    assert json.loads(path.read_text()) == expected
+
+
+@pytest.mark.parametrize("argv", [[], ["--profile", str(TEST_FILES_DIR / "yaml_format.*")], ["--profile", "--stdin"]])
+def test_cli_usage_errors(argv, capsys):
+    with pytest.raises(SystemExit) as error:
+        main(argv)
+    assert error.value.code == 2
+    assert "usage:" in capsys.readouterr().err
+
+
+def test_cli_batch_profile(context):
+    with pytest.raises(ValueError):
+        yamlscript(TEST_FILES_DIR / "yaml_format.*", values=context, profile=True)
@@ -0,0 +1,107 @@
+import copy
+import types
+
+import pytest
+
+from yamlscript import Compactor, compile, load, sub
+from yamlscript.compact import compact
+
+from .conftest import TEST_FILES_DIR
+from .test_load import EXPECTED
+
+TEMPLATE = {
+    "items": [{"name": "${my_name}", "tags": ["a", "b"], "id": i} for i in range(3)],
+    "copies": [{"name": "${my_name}", "tags": ["a", "b"]}] * 2,
+}
+
+
+def _thaw(obj):
+    if isinstance(obj, types.MappingProxyType):
+        return {key: _thaw(value) for key, value in obj.items()}
+    if isinstance(obj, tuple):
+        return [_thaw(item) for item in obj]
+    return obj
+
+
+def test_compact_shares_subtrees(context):
+    out = sub(TEMPLATE, copy.deepcopy(context), compact=True)
+    assert _thaw(out) == sub(TEMPLATE, copy.deepcopy(context))
+    assert out["copies"][0] is out["copies"][1]
+    assert out["items"][0]["tags"] is out["items"][1]["tags"] is out["copies"][0]["tags"]
+    assert out["items"][0]["name"] is out["items"][2]["name"]
+    assert out["items"][0] is not out["items"][1]
+
+
+def test_compact_read_only(context):
+    out = sub(TEMPLATE, copy.deepcopy(context), compact=True)
+    with pytest.raises(TypeError):
+        out["items"] = None
+    with pytest.raises(TypeError):
+        out["items"][0] = None
+
+
+@pytest.mark.parametrize(
+    "obj", [
+        [1, True, 1.0],
+        [0.0, -0.0],
+        [None, None, {}, [], ""],
+        {"a": {"b": 1}, "c": {"b": True}},
+    ]
+)
+def test_compact_keeps_types(obj):
+    out = _thaw(compact(obj))
+    assert out == obj
+    assert [type(item) for item in out] == [type(item) for item in obj]
+    if obj == [0.0, -0.0]:
+        assert str(out) == "[0.0, -0.0]"
+
+
+class Unhashable:
+    __hash__ = None
+
+
+def test_compact_unhashable_leaves():
+    value = Unhashable()
+    assert compact([value, value]) == (value, value)
+
+
+def test_compactor_stats(context):
+    compactor = Compactor()
+    sub(TEMPLATE, copy.deepcopy(context), compact=compactor)
+    stats = compactor.stats()
+    assert 0 < stats["size"] < stats["input_size"]
+    assert stats["saved"] == stats["input_size"] - stats["size"] == compactor.saved
+    first = sub(TEMPLATE, copy.deepcopy(context), compact=compactor)
+    second = sub(TEMPLATE, copy.deepcopy(context), compact=compactor)
+    assert first is second
+    assert compactor.size == stats["size"]
+    compactor.clear()
+    assert compactor.stats() == {"objects": 0, "references": 0, "input_size": 0, "size": 0, "saved": 0}
+
+
+def test_compact_render_and_load(context):
+    assert _thaw(compile(TEMPLATE).render(copy.deepcopy(context), compact=True)) == sub(TEMPLATE, copy.deepcopy(context))
+    out = load(TEST_FILES_DIR / "yaml_format.yaml", copy.deepcopy(context), compact=True)
+    assert isinstance(out, types.MappingProxyType)
+    assert _thaw(out) == EXPECTED
+    with pytest.raises(ValueError):
+        load(TEST_FILES_DIR / "yaml_format.yaml", copy.deepcopy(context), lazy=True, compact=True)
+
+
+def test_compact_keeps_equal_but_distinct_values():
+    from datetime import datetime, timedelta, timezone
+    from decimal import Decimal
+
+    utc = datetime(2020, 1, 1, tzinfo=timezone.utc)
+    plus_one = datetime(2020, 1, 1, 1, tzinfo=timezone(timedelta(hours=1)))
+    out = compact([utc, plus_one, Decimal("1.0"), Decimal("1.00")])
+    assert [str(item) for item in out] == [str(utc), str(plus_one), "1.0", "1.00"]
+
+
+def test_compactor_max_objects(context):
+    compactor = Compactor(max_objects=4)
+    for name in ["a", "b", "c"] * 3:
+        out = sub(TEMPLATE, {"my_name": name}, compact=compactor)
+        assert _thaw(out) == sub(TEMPLATE, {"my_name": name})
+        assert len(compactor._table) <= 4
+    assert compactor.size == sum(size for _, size in compactor._table.values())
@@ -0,0 +1,86 @@
+import mock
+import pytest
+
+import freezegun
+from yamlscript import compile, render_many, sub
+
+from .test_sub import MOCK_NOW, MOCK_UUID, SUB_CASES, CustomGlobals
+
+
+@pytest.mark.parametrize("name,string,expected", SUB_CASES)
+@pytest.mark.parametrize("g", [CustomGlobals, {k: getattr(CustomGlobals, k) for k in dir(CustomGlobals)}])
+@mock.patch("yamlscript.globals.uuid4", lambda: MOCK_UUID)
+@freezegun.freeze_time(MOCK_NOW)
+def test_compile(name, string, expected, g, context):
+    if isinstance(expected, type) and issubclass(expected, Exception):
+        with pytest.raises(expected):
+            compile(string, g=g).render(context)
+    else:
+        output = compile(string, g=g).render(context)
+        assert output == expected, f"{name} : {output} != {expected}"
+
+
+@pytest.mark.parametrize(
+    "string,expected", [
+        ("${my_int}",                   10),
+        ("${names}",                    [{"name": "James"}, {"name": "David"}]),
+        ("${missing:${ints}}",          [0, 1, 2, 3]),
+        ("$(${ints})",                  [0, 1, 2, 3]),
+        ("$(str(${my_int})) $(str(${my_int}))", "10 10"),
+    ]
+)
+def test_compile_matches_sub(string, expected, context):
+    assert compile(string).render(context) == expected
+    assert sub(string, context) == expected
+
+
+def test_compile_renders_many_contexts():
+    template = compile({"name": "${name}", "items": ["$(${n} * 2)", "${missing:none}"]})
+    assert template.render({"name": "a", "n": 1}) == {"name": "a", "items": [2, "none"]}
+    assert template.render({"name": "b"}, values={"n": 2}) == {"name": "b", "items": [4, "none"]}
+
+
+@pytest.mark.parametrize("kwargs", [{}, {"workers": 2}, {"workers": 2, "processes": True}])
+def test_render_many(kwargs):
+    template = {"name": "${name}", "double": "$(my_func(${n}))", "static": ["a", 1]}
+    contexts = ({"name": f"tenant-{i}", "n": i} for i in range(20))
+    output = render_many(template, contexts, g=CustomGlobals, **kwargs)
+    assert list(output) == [
+        {"name": f"tenant-{i}", "double": i * 2, "static": ["a", 1]} for i in range(20)
+    ]
+
+
+def test_render_many_values():
+    template = compile("${name}-${suffix}")
+    output = render_many(template, [{"name": "a"}, {"name": "b"}], values={"suffix": "x"})
+    assert list(output) == ["a-x", "b-x"]
+
+
+@pytest.mark.parametrize("kwargs", [{}, {"workers": 2}, {"workers": 2, "processes": True}])
+def test_render_many_error(kwargs):
+    with pytest.raises(ValueError):
+        list(render_many("${missing}", [{}, {}], **kwargs))
+
+
+@pytest.mark.parametrize("share", [False, True])
+def test_compile_static_subtrees(share):
+    template = compile(
+        {"static": {"a": ["b", 1, "\\${c}"], "d": (2, 3)}, "name": "${name}"}, share=share
+    )
+    first, second = template.render({"name": "x"}), template.render({"name": "y"})
+    assert first == {"static": {"a": ["b", 1, "${c}"], "d": [2, 3]}, "name": "x"}
+    assert second["name"] == "y"
+    assert (first["static"] is second["static"]) is share
+    assert (first["static"]["a"] is second["static"]["a"]) is share
+
+
+def test_compile_output_is_independent():
+    template = compile({"db": {"opts": {"pool": 5}}, "name": "${n}"})
+    template.render({"n": "a"})["db"]["opts"]["pool"] = 99
+    assert template.render({"n": "b"}) == {"db": {"opts": {"pool": 5}}, "name": "b"}
+
+
+def test_compile_static_document():
+    template = compile(["a", {"b": "c"}], share=True)
+    assert template.render() is template.render()
+    assert compile(["a", {"b": "c"}]).render() == ["a", {"b": "c"}]
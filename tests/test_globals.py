@@ -0,0 +1,106 @@
+import pickle
+
+import pytest
+
+from yamlscript import ExpressionGlobals, sub
+
+
+class CachedGlobals(ExpressionGlobals):
+
+    @staticmethod
+    def my_func(i): return i*2
+
+
+def test_namespace_is_cached():
+    assert CachedGlobals.namespace() is CachedGlobals.namespace()
+    assert CachedGlobals.namespace() is not ExpressionGlobals.namespace()
+    assert "my_func" in CachedGlobals.namespace()
+    assert "namespace" not in CachedGlobals.namespace()
+
+
+def test_namespace_is_read_only():
+    with pytest.raises(TypeError):
+        CachedGlobals.namespace()["my_func"] = None
+    with pytest.raises(TypeError):
+        CachedGlobals.namespace().update(my_func=None)
+
+
+def test_namespace_invalidated_on_change():
+    class ChangingGlobals(CachedGlobals):
+        pass
+
+    namespace = ChangingGlobals.namespace()
+    CachedGlobals.other_func = staticmethod(lambda i: i * 3)
+    try:
+        assert ChangingGlobals.namespace() is not namespace
+        assert sub("$(other_func(2))", g=ChangingGlobals) == 6
+    finally:
+        del CachedGlobals.other_func
+    assert "other_func" not in ChangingGlobals.namespace()
+
+
+def test_namespace_as_globals():
+    namespace = CachedGlobals.namespace()
+    assert sub("$(my_func(2))", g=namespace) == 4
+    assert pickle.loads(pickle.dumps(namespace)) == namespace
+
+
+@pytest.fixture(params=["python", "numpy"])
+def backend(request, monkeypatch):
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+        monkeypatch.setattr("yamlscript.globals.VECTORIZE_THRESHOLD", 0)
+    else:
+        monkeypatch.setattr("yamlscript.globals._numpy", lambda: None)
+    return request.param
+
+
+SAMPLES = [3, 1, 4, 1, 5, 9, 2, 6, 5, 3]
+
+
+@pytest.mark.parametrize(
+    "name,args,expected", [
+        ("mean",        (SAMPLES,),                     3.9),
+        ("mean",        (range(1, 3),),                 1.5),
+        ("percentile",  (SAMPLES, 50),                  3.5),
+        ("percentile",  (SAMPLES, [0, 25, 100]),        [1.0, 2.25, 9.0]),
+        ("percentile",  ([7], 90),                      7.0),
+        ("histogram",   (SAMPLES, 4),                   {"counts": [3, 3, 3, 1], "edges": [1.0, 3.0, 5.0, 7.0, 9.0]}),
+        ("histogram",   (SAMPLES, [0, 2, 10]),          {"counts": [2, 8], "edges": [0.0, 2.0, 10.0]}),
+        ("histogram",   (SAMPLES, 2, (0, 4)),           {"counts": [2, 4], "edges": [0.0, 2.0, 4.0]}),
+        ("histogram",   ([5, 5], 2),                    {"counts": [0, 2], "edges": [4.5, 5.0, 5.5]}),
+        ("histogram",   ([], 2),                        {"counts": [0, 0], "edges": [0.0, 0.5, 1.0]}),
+        ("add",         ([1, 2], [3, 4]),               [4, 6]),
+        ("add",         (1, 2),                         3),
+        ("subtract",    (10, [1, 2]),                   [9, 8]),
+        ("multiply",    ((1, 2), 2),                    [2, 4]),
+        ("divide",      ([1, 3], 2),                    [0.5, 1.5]),
+        ("mean",        ([],),                          ValueError),
+        ("percentile",  (SAMPLES, 101),                 ValueError),
+        ("histogram",   (SAMPLES, [2, 1]),              ValueError),
+        ("add",         ([1, 2], [1]),                  ValueError),
+        ("divide",      ([1, 2], [1, 0]),               ZeroDivisionError),
+    ]
+)
+def test_batched_globals(name, args, expected, backend):
+    func = getattr(ExpressionGlobals, name)
+    if isinstance(expected, type) and issubclass(expected, Exception):
+        with pytest.raises(expected):
+            func(*args)
+    else:
+        output = func(*args)
+        assert output == pytest.approx(expected) if not isinstance(expected, dict) else output == expected
+        assert type(output) is type(expected)
+        if isinstance(output, list):
+            assert [type(item) for item in output] == [type(item) for item in expected]
+
+
+def test_group_sum():
+    records = [{"k": "a", "v": 1}, {"k": "b", "v": 2.5}, {"k": "a", "v": 3}]
+    assert ExpressionGlobals.group_sum(records, "k", "v") == {"a": 4, "b": 2.5}
+
+
+def test_batched_globals_in_expressions(backend):
+    context = {"samples": SAMPLES}
+    assert sub("$(mean(multiply(${samples}, 2)))", context) == pytest.approx(7.8)
+    assert sub("$(histogram(${samples}, 2)['counts'])", context) == [6, 4]
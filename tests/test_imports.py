@@ -0,0 +1,42 @@
+import subprocess
+import sys
+
+import pytest
+
+HEAVY = (
+    "asyncio",
+    "concurrent.futures",
+    "dateutil",
+    "fire",
+    "hashlib",
+    "jsonpointer",
+    "numpy",
+    "pickle",
+    "tempfile",
+    "yaml",
+)
+
+
+def _imported(statement):
+    script = f"import sys; {statement}; print(' '.join(sorted(sys.modules)))"
+    out = subprocess.run([sys.executable, "-c", script], check=True, capture_output=True, text=True).stdout
+    return set(out.split())
+
+
+@pytest.mark.parametrize(
+    "statement",
+    ["import yamlscript", "from yamlscript import load, sub, compile", "import yamlscript.cli"],
+)
+def test_no_heavy_imports(statement):
+    assert not _imported(statement) & set(HEAVY)
+
+
+def test_lazy_exports_resolve():
+    import yamlscript
+    from yamlscript import loader, parser
+
+    assert yamlscript.load is loader.load
+    assert yamlscript.sub is parser.sub
+    assert "load" in dir(yamlscript)
+    with pytest.raises(AttributeError):
+        yamlscript.missing
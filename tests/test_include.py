@@ -0,0 +1,81 @@
+import copy
+
+import pytest
+
+from yamlscript import Registry, iter_load, load, sub
+
+from .conftest import TEST_FILES_DIR
+
+INCLUDES_DIR = TEST_FILES_DIR / "includes"
+
+SHARED = {"greeting": "hello James", "ints": [0, 1, 2, 3]}
+
+EXPECTED = {
+    "name": "James",
+    "shared": SHARED,
+    "again": SHARED,
+    "nested": {"shared": SHARED, "json": {"name": "David"}},
+}
+
+
+def test_include(context):
+    registry = Registry()
+    assert load(INCLUDES_DIR / "main.yaml", copy.deepcopy(context), registry=registry) == EXPECTED
+    assert registry.reads == 4
+
+
+def test_include_registry_reuse(context):
+    registry = Registry()
+    load(INCLUDES_DIR / "main.yaml", copy.deepcopy(context), registry=registry)
+    load(INCLUDES_DIR / "nested" / "child.yaml", copy.deepcopy(context), registry=registry)
+    assert registry.reads == 4
+    registry.clear()
+    load(INCLUDES_DIR / "nested" / "child.yaml", copy.deepcopy(context), registry=registry)
+    assert registry.reads == 7
+
+
+def test_include_reloads_changed_files(tmp_path):
+    (tmp_path / "main.yaml").write_text("value: $(include('part.yaml'))")
+    (tmp_path / "part.yaml").write_text("a: 1")
+    registry = Registry()
+    assert load(tmp_path / "main.yaml", registry=registry) == {"value": {"a": 1}}
+    (tmp_path / "part.yaml").write_text("a: 22")
+    assert load(tmp_path / "main.yaml", registry=registry) == {"value": {"a": 22}}
+    assert registry.reads == 3
+
+
+@pytest.mark.parametrize("name", ["cycle_a.yaml", "self.yaml"])
+def test_include_cycle(name):
+    with pytest.raises(ValueError, match="include cycle"):
+        load(INCLUDES_DIR / name)
+
+
+def test_include_missing(tmp_path):
+    (tmp_path / "main.yaml").write_text("value: $(include('missing.yaml'))")
+    with pytest.raises(Exception):
+        load(tmp_path / "main.yaml")
+
+
+def test_include_outside_load():
+    with pytest.raises(ValueError, match="while loading"):
+        sub("$(include('shared.yaml'))")
+
+
+def test_include_registry_entries_unchanged(tmp_path):
+    registry = Registry()
+    path = tmp_path / "template.yaml"
+    path.write_text("a: {b: {c: 1}}\nname: ${name}\n")
+    load(path, parse=False, registry=registry)["a"]["b"]["c"] = 2
+    load(path, {"name": "x"}, registry=registry)["a"]["b"]["c"] = 3
+    assert load(path, {"name": "y"}, registry=registry) == {"a": {"b": {"c": 1}}, "name": "y"}
+    assert registry.reads == 1
+
+
+def test_include_iter_load(context, tmp_path):
+    path = tmp_path / "documents.yaml"
+    path.write_text(f"a: $(include('{INCLUDES_DIR / 'shared.yaml'}'))\n---\nb: ${{my_name}}\n")
+    documents = iter_load(path, copy.deepcopy(context))
+    assert next(documents) == {"a": SHARED}
+    with pytest.raises(ValueError):
+        sub("$(include('shared.yaml'))")
+    assert list(documents) == [{"b": "James"}]
@@ -0,0 +1,100 @@
+import pytest
+
+from yamlscript import ExpressionGlobals, LazyMapping, LazySequence, RenderCache, lazy_sub, load, sub
+
+from .conftest import TEST_FILES_DIR
+from .test_load import EXPECTED
+
+CALLS = []
+
+
+class CountingGlobals(ExpressionGlobals):
+
+    @staticmethod
+    def count(name):
+        CALLS.append(name)
+        return name
+
+
+TEMPLATE = {
+    "a": "$(count('a'))",
+    "b": {"c": "$(count('c'))", "d": ["$(count('d0'))", "${my_name}", ["$(count('d2'))"]]},
+    "e": 1,
+    "f": "\\${escaped}",
+}
+
+
+@pytest.fixture(autouse=True)
+def calls():
+    CALLS.clear()
+    return CALLS
+
+
+def test_lazy_renders_on_access(context, calls):
+    document = lazy_sub(TEMPLATE, context, g=CountingGlobals)
+    assert isinstance(document, LazyMapping)
+    assert calls == []
+    assert document["b"]["d"][0] == "d0"
+    assert calls == ["d0"]
+    assert document["b"]["d"][0] == "d0"
+    assert document["b"]["d"][-2] == "James"
+    assert calls == ["d0"]
+    assert isinstance(document["b"]["d"][2], LazySequence)
+    assert calls == ["d0"]
+
+
+def test_lazy_materialize(context, calls):
+    document = lazy_sub(TEMPLATE, context, g=CountingGlobals)
+    assert document["a"] == "a"
+    output = document.materialize()
+    assert output == sub(TEMPLATE, context, g=CountingGlobals)
+    assert type(output["b"]["d"]) is list
+    assert sorted(calls) == ["a", "a", "c", "c", "d0", "d0", "d2", "d2"]
+
+
+def test_lazy_read_only(context):
+    document = lazy_sub(TEMPLATE, context, g=CountingGlobals)
+    with pytest.raises(TypeError):
+        document["a"] = 1
+    with pytest.raises(TypeError):
+        document["b"]["d"][0] = 1
+    with pytest.raises(KeyError):
+        document["missing"]
+    with pytest.raises(IndexError):
+        document["b"]["d"][3]
+
+
+def test_lazy_sequence(context):
+    document = lazy_sub(["${my_name}", "${my.name}", 3], context)
+    assert document[1:] == ["David", 3]
+    assert document == ["James", "David", 3]
+    assert list(reversed(document)) == [3, "David", "James"]
+    assert len(document) == 3
+
+
+@pytest.mark.parametrize("kwargs", [{}, {"file_type": "yaml"}])
+def test_load_lazy(kwargs, context, tmp_path):
+    path = TEST_FILES_DIR / ("anonymous_format" if kwargs else "yaml_format.yaml")
+    document = load(path, context=context, lazy=True, **kwargs)
+    assert isinstance(document, LazyMapping)
+    assert document["name"] == "James"
+    assert document.materialize() == EXPECTED
+    cache = RenderCache(tmp_path)
+    assert load(path, context=context, lazy=True, cache=cache, **kwargs) == EXPECTED
+
+
+def test_lazy_contains_does_not_render(calls):
+    out = lazy_sub({"a": "$(count('a'))", "b": "$({}['x'])"}, g=CountingGlobals)
+    assert "a" in out and "b" in out and "c" not in out
+    assert calls == []
+    assert out.get("c", 1) == 1
+    with pytest.raises(KeyError):
+        out.get("b")
+
+
+def test_lazy_sequence_negative_index():
+    out = lazy_sub([1, 2, 3])
+    assert out[-1] == 3
+    with pytest.raises(IndexError):
+        out[-5]
+    assert out._cache == {2: 3}
@@ -2,8 +2,9 @@ import json
 import pathlib
 
 import pytest
+import yaml
 
-from yamlscript import load
+from yamlscript import iter_load, load, parser
 
 from .conftest import TEST_FILES_DIR
 
@@ -22,6 +23,7 @@ UNPARSED = json.loads((TEST_FILES_DIR / "json_format.json").read_text())
         (TEST_FILES_DIR / "json_format.json", {"parse": False}, UNPARSED),
         (TEST_FILES_DIR / "yaml_format.yaml", {}, EXPECTED),
         (TEST_FILES_DIR / "yaml_format.yaml", {"parse": False}, UNPARSED),
+        (TEST_FILES_DIR / "yaml_format.yaml", {"loader": yaml.SafeLoader}, EXPECTED),
         (TEST_FILES_DIR / "yaml_format.yml", {}, EXPECTED),
         (TEST_FILES_DIR / "yaml_format.yml", {"parse": False}, UNPARSED),
         (TEST_FILES_DIR / "anonymous_format", {"file_type": "yaml"}, EXPECTED),
@@ -46,3 +48,47 @@ def test_load(path, kwargs, expected, context):
     else:
         output = load(path=path, **kwargs, context=context)
         assert output == expected
+
+
+@pytest.mark.parametrize(
+    "path,kwargs,expected",
+    [
+        (
+            TEST_FILES_DIR / "multi_document.yaml",
+            {},
+            [{"name": "James"}, {"list": ["James", "David"]}, ["David", 11]],
+        ),
+        (
+            TEST_FILES_DIR / "multi_document.yaml",
+            {"parse": False},
+            [
+                {"name": "${my_name}"},
+                {"list": "$([i['${my_key}'] for i in ${names}])"},
+                ["${my.name}", "$(${my_int} + 1)"],
+            ],
+        ),
+        (
+            TEST_FILES_DIR / "multi_document.yaml",
+            {"loader": yaml.SafeLoader},
+            [{"name": "James"}, {"list": ["James", "David"]}, ["David", 11]],
+        ),
+        (TEST_FILES_DIR / "json_format.json", {}, [EXPECTED]),
+        (TEST_FILES_DIR / "anonymous_format", {"file_type": "yaml"}, [EXPECTED]),
+        (TEST_FILES_DIR / "anonymous_format", {"file_type": "nope"}, NotImplementedError),
+        (TEST_FILES_DIR / "anonymous_format", {}, Exception),
+        (TEST_FILES_DIR, {}, Exception),
+    ],
+)
+def test_iter_load(path, kwargs, expected, context):
+    if isinstance(expected, type) and issubclass(expected, Exception):
+        with pytest.raises(expected):
+            iter_load(path=path, **kwargs, context=context)
+    else:
+        output = iter_load(path=path, **kwargs, context=context)
+        assert list(output) == expected
+
+
+def test_load_workers(context, monkeypatch):
+    monkeypatch.setattr(parser, "PARALLEL_THRESHOLD", 2)
+    output = load(TEST_FILES_DIR / "yaml_format.yaml", context=context, workers=2)
+    assert output == EXPECTED
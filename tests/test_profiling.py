@@ -0,0 +1,60 @@
+import json
+
+import pytest
+
+from yamlscript import Stats, compile, iter_json, load, profile, sub
+from yamlscript.cli import yamlscript
+
+from .conftest import TEST_FILES_DIR
+from .test_load import EXPECTED
+from .test_sub import CustomGlobals
+
+TEMPLATE = {"a": ["$(my_func(1))", "$(my_func(1))"], "b/c": "${my_name}", "d": 1}
+
+
+@pytest.mark.parametrize("render", [
+    lambda context: sub(TEMPLATE, context, g=CustomGlobals),
+    lambda context: compile(TEMPLATE, g=CustomGlobals).render(context),
+])
+def test_profile_render(render, context):
+    with profile() as stats:
+        assert render(context) == {"a": [2, 2], "b/c": "James", "d": 1}
+    assert {"render", "resolve", "evaluate"} <= set(stats.phases)
+    assert stats.expressions["my_func(1)"][0] == 2
+    assert sorted(pointer for pointer, _ in stats.slowest_paths) == ["/a/0", "/a/1", "/b~1c"]
+
+
+def test_profile_slowest(context):
+    with profile(Stats(slowest=1)) as stats:
+        sub(TEMPLATE, context, g=CustomGlobals)
+    assert len(stats.slowest_paths) == 1
+
+
+def test_profile_load(context):
+    with profile() as stats:
+        assert load(TEST_FILES_DIR / "yaml_format.yaml", context=context) == EXPECTED
+    assert list(stats.as_dict()["phases"]) == ["read", "parse", "render", "resolve", "evaluate"]
+
+
+def test_profile_inactive(context):
+    with profile() as stats:
+        pass
+    sub(TEMPLATE, context, g=CustomGlobals)
+    assert stats.as_dict() == {"phases": {}, "expressions": {}, "slowest_paths": []}
+
+
+def test_cli_profile(context, capsys):
+    output = yamlscript(TEST_FILES_DIR / "yaml_format.yaml", values=context, profile=True)
+    assert json.loads(output) == EXPECTED
+    stats = json.loads(capsys.readouterr().err)
+    assert {"render", "dump"} <= set(stats["phases"])
+    assert len(stats["expressions"]) == 2
+    assert stats["slowest_paths"]
+
+
+@pytest.mark.parametrize("template", [TEMPLATE, compile(TEMPLATE, g=CustomGlobals)])
+def test_profile_iter_json(template, context):
+    with profile() as stats:
+        assert json.loads("".join(iter_json(template, context, g=CustomGlobals))) == {"a": [2, 2], "b/c": "James", "d": 1}
+    assert {"render", "resolve", "evaluate"} <= set(stats.phases)
+    assert sorted(pointer for pointer, _ in stats.slowest_paths) == ["/a/0", "/a/1", "/b~1c"]
@@ -0,0 +1,119 @@
+import io
+import json
+import subprocess
+import sys
+import threading
+
+import pytest
+
+from yamlscript.server import Client, RenderError, Server
+
+from .conftest import TEST_FILES_DIR
+from .test_load import EXPECTED, UNPARSED
+
+
+@pytest.mark.parametrize(
+    "request_,expected",
+    [
+        ({"path": str(TEST_FILES_DIR / "json_format.json")}, EXPECTED),
+        ({"path": str(TEST_FILES_DIR / "yaml_format.yaml"), "parse": False}, UNPARSED),
+        ({"path": str(TEST_FILES_DIR / "anonymous_format"), "file_type": "yaml"}, EXPECTED),
+        ({"document": "name: ${my_name}"}, {"name": "James"}),
+        ({"document": '{"name": "${my_name}"}', "file_type": "json"}, {"name": "James"}),
+        ({"document": {"name": "${my_name}"}}, {"name": "James"}),
+    ],
+)
+def test_server_render(request_, expected, context):
+    assert Server().handle(dict(request_, context=dict(context), id=1)) == {"id": 1, "result": expected}
+
+
+@pytest.mark.parametrize(
+    "request_,error",
+    [
+        ({"path": str(TEST_FILES_DIR / "missing.yaml")}, "Exception"),
+        ({"path": str(TEST_FILES_DIR / "anonymous_format"), "file_type": "nope"}, "NotImplementedError"),
+        ({"document": "a: 1", "file_type": "nope"}, "NotImplementedError"),
+        ({}, "ValueError"),
+    ],
+)
+def test_server_error(request_, error):
+    assert Server().handle(request_)["error"]["type"] == error
+
+
+def test_server_warm_cache(tmp_path):
+    path = tmp_path / "document.yaml"
+    path.write_text("name: ${name}")
+    server = Server()
+    assert server.render({"path": str(path), "values": {"name": "a"}}) == {"name": "a"}
+    assert server.render({"path": str(path), "values": {"name": "b"}}) == {"name": "b"}
+    assert (server.hits, server.misses) == (1, 1)
+    path.write_text("other: ${name}")
+    assert server.render({"path": str(path), "values": {"name": "c"}}) == {"other": "c"}
+    assert (server.hits, server.misses) == (1, 2)
+
+
+def test_server_max_templates():
+    server = Server(max_templates=2)
+    for document in ("a: 1", "b: 2", "c: 3", "a: 1"):
+        server.render({"document": document})
+    assert (server.hits, server.misses) == (0, 4)
+
+
+def test_server_stream(context):
+    reader = io.StringIO(json.dumps({"document": "name: ${my_name}", "context": context}) + "\n\nnot json\n[]\n")
+    writer = io.StringIO()
+    Server().serve_stream(reader, writer)
+    responses = [json.loads(line) for line in writer.getvalue().splitlines()]
+    assert responses[0] == {"result": {"name": "James"}}
+    assert [response["error"]["type"] for response in responses[1:]] == ["JSONDecodeError", "TypeError"]
+
+
+def test_server_unix_socket(tmp_path, context):
+    unix_server = Server().listen(tmp_path / "s.sock")
+    thread = threading.Thread(target=unix_server.serve_forever)
+    thread.start()
+    try:
+        with Client.connect(tmp_path / "s.sock") as client:
+            assert client.render(TEST_FILES_DIR / "yaml_format.yaml", context=context) == EXPECTED
+            assert client.render(document={"a": "$(1 + 1)"}) == {"a": 2}
+            with pytest.raises(RenderError):
+                client.render(TEST_FILES_DIR / "missing.yaml")
+    finally:
+        unix_server.shutdown()
+        unix_server.server_close()
+        thread.join()
+    assert not (tmp_path / "s.sock").exists()
+
+
+def test_server_cli(context):
+    process = subprocess.Popen(
+        [sys.executable, "-m", "yamlscript", "serve"], stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True
+    )
+    client = Client(process.stdout, process.stdin)
+    try:
+        assert client.render(TEST_FILES_DIR / "json_format.json", context=context) == EXPECTED
+        assert client.render(TEST_FILES_DIR / "json_format.json", parse=False) == UNPARSED
+    finally:
+        process.stdin.close()
+        process.wait()
+    assert process.returncode == 0
+
+
+def test_server_include(context):
+    server = Server()
+    request = {"path": str(TEST_FILES_DIR / "includes" / "main.yaml"), "context": context}
+    first = server.render(json.loads(json.dumps(request)))
+    assert server.render(json.loads(json.dumps(request))) == first
+    assert first["nested"]["json"] == {"name": "David"}
+    assert server._registry.reads == 3
+
+
+def test_server_unserializable_result(context):
+    reader = io.StringIO(
+        json.dumps({"id": 1, "document": "$(now())"}) + "\n" + json.dumps({"id": 2, "document": "${my_name}", "context": context}) + "\n"
+    )
+    writer = io.StringIO()
+    Server().serve_stream(reader, writer)
+    first, second = [json.loads(line) for line in writer.getvalue().splitlines()]
+    assert first["id"] == 1 and first["error"]["type"] == "TypeError"
+    assert second == {"id": 2, "result": "James"}
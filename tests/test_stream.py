@@ -0,0 +1,57 @@
+import io
+import json
+
+import freezegun
+import mock
+import pytest
+
+from yamlscript import compile, dump, iter_json, sub
+
+from .test_sub import MOCK_NOW, MOCK_UUID, SUB_CASES, CustomGlobals
+
+TEMPLATE = {
+    "name": "${my_name}",
+    "empty": {},
+    "none": [],
+    "nested": {"list": ["${ints}", "$(1 + 1)", {"a": None, "b": True}], 1: 1.5, None: "x", False: 0},
+    "static": {"a": [1, 2, {"b": "c"}]},
+}
+
+
+@pytest.mark.parametrize("template", [lambda obj: obj, compile])
+@pytest.mark.parametrize("obj", [TEMPLATE, [], {}, "${my}", 1, None])
+def test_iter_json(template, obj, context):
+    assert "".join(iter_json(template(obj), dict(context))) == json.dumps(sub(obj, dict(context)))
+
+
+@pytest.mark.parametrize("name,string,expected", SUB_CASES)
+@mock.patch("yamlscript.globals.uuid4", lambda: MOCK_UUID)
+@freezegun.freeze_time(MOCK_NOW)
+def test_iter_json_sub_cases(name, string, expected, context):
+    try:
+        expected = json.dumps({"value": sub(string, dict(context), g=CustomGlobals)})
+    except Exception as ex:
+        expected = type(ex)
+    if isinstance(expected, type):
+        with pytest.raises(expected):
+            list(iter_json({"value": string}, dict(context), g=CustomGlobals))
+    else:
+        assert "".join(iter_json({"value": string}, dict(context), g=CustomGlobals)) == expected, name
+
+
+def test_iter_json_incremental(context):
+    chunks = iter_json([{"a": "${my_name}"}, "$(1 / 0)"], dict(context))
+    assert next(chunks) + next(chunks) + next(chunks) == '[{"a": "James"'
+    with pytest.raises(ZeroDivisionError):
+        list(chunks)
+
+
+def test_iter_json_bad_key():
+    with pytest.raises(TypeError):
+        list(iter_json({(1, 2): 1}))
+
+
+def test_dump(context):
+    stream = io.StringIO()
+    dump(TEMPLATE, stream, dict(context), values={"my_name": "Bob"})
+    assert json.loads(stream.getvalue())["name"] == "Bob"
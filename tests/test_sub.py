@@ -6,7 +6,7 @@ import pytest
 from dateutil.relativedelta import relativedelta
 
 import freezegun
-from yamlscript import ExpressionGlobals, sub
+from yamlscript import ExpressionGlobals, expression_cache_clear, expression_cache_info, parser, sub
 
 
 class CustomGlobals(ExpressionGlobals):
@@ -21,126 +21,147 @@ MOCK_UUID = str(uuid.uuid4())
 MOCK_STRIPPED_UUID = MOCK_UUID.replace("-", "")
 
 
-@pytest.mark.parametrize(
-    "name,string,expected", [
-
-        # strings
-        ("empty string",                        "",                             ""),
-        ("no vars or expressions",              "some string",                  "some string"),
-        ("dollar amount",                       "$200",                         "$200"),
-        ("dollar amount with decimals",         "$200.50",                      "$200.50"),
-        ("only char",                           "$",                            "$"),
-        ("last char",                           "something$",                   "something$"),
-        ("in string",                           "some$thing",                   "some$thing"),
-
-        # variables
-        ("empty var",                           "${}",                          ""),
-        ("top level var",                       "${my_name}",                   "James"),
-        ("nested var",                          "${my.name}",                   "David"),
-        ("list item var",                       "${names.1.name}",              "David"),
-
-        # defaults
-        ("var with default",                    "${names.2.name:Mike}",           "Mike"),
-        ("var with var default",                "${names.2.name:${names.1.name}}","David"),
-        ("var with invalid default",            "${names.2.name:${names.3.name}}", ValueError),
-        ("var with expression default",         "${names.2.name:$(my_func('${names.1.name}'))}",
-                                                "DavidDavid"),
-
-        # invalid variables
-        ("unclosed variable",                   "${my.name",                    ValueError),
-        ("unclosed nested variable",            "${obj.${my_key}.string",       ValueError),
-        ("unclosed nested variable",            "${obj.${my_key.string}",       ValueError),
-
-        # escaped variable
-        ("escaped empty var",                   "\\${}",                        "${}"),
-        ("escaped top level var",               "\\${my_name}",                 "${my_name}"),
-        ("escaped nested var",                  "\\${my.name}",                 "${my.name}"),
-        ("escaped list item var",               "\\${names.1.name}",            "${names.1.name}"),
-        ("escaped var with nested var",         "\\${names.1.${my_key}}",       "${names.1.name}"),
-        ("escaped var with escaped var",        "\\${names.1.\\${my_key}}",     "${names.1.${my_key}}"),
-
-        # expressions
-        ("empty expression",                    "$()",                          ""),
-        ("expression with string var",          "$('${my.name}')",              "David"),
-        ("expression with string concat var",   "$('name: ' + '${my.name}')",   "name: David"),
-        ("custom g function",                   "$(my_func(10))",               20),
-        ("custom g function to string",         "$(str(my_func(10)))",          "20"),
-        ("custom g function with var param",    "$(my_func(${my_int}))",        20),
-
-        # invalid expressions
-        ("unclosed expression",                 "$(1 + 2",                      ValueError),
-        ("nested unclosed variable",            "$('name' + ${my_key)",         ValueError),
-        ("unclosed nested variable",            "$('name' + ${my_key}",         ValueError),
-
-        # escaped expressions
-        ("escaped empty expression",            "\\$()",                        "$()"),
-        ("escaped expression with var",         "\\$(10 + ${my_int})",          "$(10 + 10)"),
-        ("escaped expression with escaped var", "\\$(10 + \\${my_int})",        "$(10 + ${my_int})"),
-
-        # methods
-        ("now",                                 "$(now())",                     MOCK_NOW),
-        ("today",                               "$(today())",                   MOCK_TODAY),
-        ("date from string",                    "$(date('1970-01-01'))",        date(year=1970, month=1, day=1)),
-
-        ("date from parts",                     "$(date(year=1970, month=1, day=1))",
-                                                date(year=1970, month=1, day=1)),
-
-        ("datetime from string",                "$(datetime('1970-01-01T00:00:00.000+00:00'))",
-                                                datetime(year=1970, month=1, day=1, hour=0, minute=0, second=0, microsecond=0, tzinfo=timezone.utc)),
-
-        ("datetime from parts",                 "$(datetime(year=1970, month=1, day=1, "
-                                                "           hour=0, minute=0, second=0, "
-                                                "           microsecond=0, utc_offset=0))",
-                                                datetime(year=1970, month=1, day=1, hour=0, minute=0, second=0, microsecond=0, tzinfo=timezone.utc)),
-
-        ("years",                               "$(years(${my_int}))",          relativedelta(years=10)),
-        ("months",                              "$(months(${my_int}))",         relativedelta(months=10)),
-        ("weeks",                               "$(weeks(${my_int}))",          relativedelta(weeks=10)),
-        ("days",                                "$(days(${my_int}))",           relativedelta(days=10)),
-        ("hours",                               "$(hours(${my_int}))",          relativedelta(hours=10)),
-        ("minutes",                             "$(minutes(${my_int}))",        relativedelta(minutes=10)),
-        ("seconds",                             "$(seconds(${my_int}))",        relativedelta(seconds=10)),
-        ("microseconds",                        "$(microseconds(${my_int}))",   relativedelta(microseconds=10)),
-        ("enumerate",                           "$(enumerate(${names}))",       [[0, {'name': 'James'}], [1, {'name': 'David'}]]),
-        ("map",                                 "$(map(my_func, ${ints}))",     [0, 2, 4, 6]),
-        ("map",                                 "$(filter("
-                                                "   lambda i: i > 1, ${ints}"
-                                                "))",                           [2, 3]),
-        ("sum",                                 "$(sum(${ints}))",              6),
-        ("min",                                 "$(min(${ints}))",              0),
-        ("max",                                 "$(max(${ints}))",              3),
-        ("uuid",                                "$(uuid())",                    MOCK_UUID),
-        ("stripped uuid",                       "$(uuid(strip=True))",          MOCK_STRIPPED_UUID),
-        ("nested exp",                          "$($(my_func(10) - 10))",       10),
-
-        ("generated list",                      "$(["
-                                                "   i['${my_key}']"
-                                                "   for i in ${names}"
-                                                "])",
-                                                ["James", "David"]),
-
-        ("unhandled value in list",             ["${names.0.name}", "${names.1.name}", 123],
-                                                ["James", "David", 123]),
-
-        ("variables in list",                   ["${names.0.name}", "${names.1.name}"],
-                                                ["James", "David"]),
-
-        ("generated and enumerated object",     "$({"
-                                                "   item['${my_key}']: my_func(${my_int} + index)"
-                                                "   for index, item in enumerate(${names})"
-                                                "})",
-                                                {"James": 20, "David": 22}),
-
-        ("variables in object",                 {"a": "${names.0.name}", "b": "${names.1.name}"},
-                                                {"a": "James", "b": "David"}),
-
-        ("unhandled in object",                 {"a": "${names.0.name}", "b": "${names.1.name}", "c": 123},
-                                                {"a": "James", "b": "David", "c": 123}),
-
-        ("Two expressions",                     "$('${names.0.name}')-${names.1.name}-$(my_func(${my_int}))",
-                                                "James-David-20")
-    ]
-)
+SUB_CASES = [
+
+    # strings
+    ("empty string",                        "",                             ""),
+    ("no vars or expressions",              "some string",                  "some string"),
+    ("dollar amount",                       "$200",                         "$200"),
+    ("dollar amount with decimals",         "$200.50",                      "$200.50"),
+    ("only char",                           "$",                            "$"),
+    ("last char",                           "something$",                   "something$"),
+    ("in string",                           "some$thing",                   "some$thing"),
+
+    # variables
+    ("empty var",                           "${}",                          ""),
+    ("top level var",                       "${my_name}",                   "James"),
+    ("nested var",                          "${my.name}",                   "David"),
+    ("list item var",                       "${names.1.name}",              "David"),
+    ("list index var",                      "${ints.2}",                    2),
+    ("slash separated var",                 "${names/1/name}",              "David"),
+
+    # defaults
+    ("var with default",                    "${names.2.name:Mike}",           "Mike"),
+    ("var with var default",                "${names.2.name:${names.1.name}}","David"),
+    ("var with invalid default",            "${names.2.name:${names.3.name}}", ValueError),
+    ("var with invalid index",              "${names.01.name:Mike}",        "Mike"),
+    ("var with index out of range",         "${ints.4:Mike}",               "Mike"),
+    ("var with key on string",              "${my_name.first:Mike}",        "Mike"),
+    ("var with key on int",                 "${my_int.first:Mike}",         "Mike"),
+    ("var with key on list",                "${names.first:Mike}",          "Mike"),
+    ("var with invalid escape",             "${my~name:Mike}",              "Mike"),
+    ("var with expression default",         "${names.2.name:$(my_func('${names.1.name}'))}",
+                                            "DavidDavid"),
+
+    # invalid variables
+    ("unclosed variable",                   "${my.name",                    ValueError),
+    ("unclosed nested variable",            "${obj.${my_key}.string",       ValueError),
+    ("unclosed nested variable",            "${obj.${my_key.string}",       ValueError),
+
+    # escaped variable
+    ("escaped empty var",                   "\\${}",                        "${}"),
+    ("escaped top level var",               "\\${my_name}",                 "${my_name}"),
+    ("escaped nested var",                  "\\${my.name}",                 "${my.name}"),
+    ("escaped list item var",               "\\${names.1.name}",            "${names.1.name}"),
+    ("escaped var with nested var",         "\\${names.1.${my_key}}",       "${names.1.name}"),
+    ("escaped var with escaped var",        "\\${names.1.\\${my_key}}",     "${names.1.${my_key}}"),
+
+    # expressions
+    ("empty expression",                    "$()",                          ""),
+    ("expression with string var",          "$('${my.name}')",              "David"),
+    ("expression with string concat var",   "$('name: ' + '${my.name}')",   "name: David"),
+    ("custom g function",                   "$(my_func(10))",               20),
+    ("custom g function to string",         "$(str(my_func(10)))",          "20"),
+    ("custom g function with var param",    "$(my_func(${my_int}))",        20),
+
+    # invalid expressions
+    ("unclosed expression",                 "$(1 + 2",                      ValueError),
+    ("nested unclosed variable",            "$('name' + ${my_key)",         ValueError),
+    ("unclosed nested variable",            "$('name' + ${my_key}",         ValueError),
+
+    # escaped expressions
+    ("escaped empty expression",            "\\$()",                        "$()"),
+    ("escaped expression with var",         "\\$(10 + ${my_int})",          "$(10 + 10)"),
+    ("escaped expression with escaped var", "\\$(10 + \\${my_int})",        "$(10 + ${my_int})"),
+
+    # methods
+    ("now",                                 "$(now())",                     MOCK_NOW),
+    ("today",                               "$(today())",                   MOCK_TODAY),
+    ("date from string",                    "$(date('1970-01-01'))",        date(year=1970, month=1, day=1)),
+
+    ("date from parts",                     "$(date(year=1970, month=1, day=1))",
+                                            date(year=1970, month=1, day=1)),
+
+    ("datetime from string",                "$(datetime('1970-01-01T00:00:00.000+00:00'))",
+                                            datetime(year=1970, month=1, day=1, hour=0, minute=0, second=0, microsecond=0, tzinfo=timezone.utc)),
+
+    ("datetime from parts",                 "$(datetime(year=1970, month=1, day=1, "
+                                            "           hour=0, minute=0, second=0, "
+                                            "           microsecond=0, utc_offset=0))",
+                                            datetime(year=1970, month=1, day=1, hour=0, minute=0, second=0, microsecond=0, tzinfo=timezone.utc)),
+
+    ("years",                               "$(years(${my_int}))",          relativedelta(years=10)),
+    ("months",                              "$(months(${my_int}))",         relativedelta(months=10)),
+    ("weeks",                               "$(weeks(${my_int}))",          relativedelta(weeks=10)),
+    ("days",                                "$(days(${my_int}))",           relativedelta(days=10)),
+    ("hours",                               "$(hours(${my_int}))",          relativedelta(hours=10)),
+    ("minutes",                             "$(minutes(${my_int}))",        relativedelta(minutes=10)),
+    ("seconds",                             "$(seconds(${my_int}))",        relativedelta(seconds=10)),
+    ("microseconds",                        "$(microseconds(${my_int}))",   relativedelta(microseconds=10)),
+    ("enumerate",                           "$(enumerate(${names}))",       [[0, {'name': 'James'}], [1, {'name': 'David'}]]),
+    ("map",                                 "$(map(my_func, ${ints}))",     [0, 2, 4, 6]),
+    ("map",                                 "$(filter("
+                                            "   lambda i: i > 1, ${ints}"
+                                            "))",                           [2, 3]),
+    ("sum",                                 "$(sum(${ints}))",              6),
+    ("min",                                 "$(min(${ints}))",              0),
+    ("max",                                 "$(max(${ints}))",              3),
+    ("uuid",                                "$(uuid())",                    MOCK_UUID),
+    ("stripped uuid",                       "$(uuid(strip=True))",          MOCK_STRIPPED_UUID),
+    ("nested exp",                          "$($(my_func(10) - 10))",       10),
+
+    ("generated list",                      "$(["
+                                            "   i['${my_key}']"
+                                            "   for i in ${names}"
+                                            "])",
+                                            ["James", "David"]),
+
+    ("unhandled value in list",             ["${names.0.name}", "${names.1.name}", 123],
+                                            ["James", "David", 123]),
+
+    ("variables in list",                   ["${names.0.name}", "${names.1.name}"],
+                                            ["James", "David"]),
+
+    ("generated and enumerated object",     "$({"
+                                            "   item['${my_key}']: my_func(${my_int} + index)"
+                                            "   for index, item in enumerate(${names})"
+                                            "})",
+                                            {"James": 20, "David": 22}),
+
+    ("variables in object",                 {"a": "${names.0.name}", "b": "${names.1.name}"},
+                                            {"a": "James", "b": "David"}),
+
+    ("unhandled in object",                 {"a": "${names.0.name}", "b": "${names.1.name}", "c": 123},
+                                            {"a": "James", "b": "David", "c": 123}),
+
+    ("repeated variables",                  "${my_name} ${my.name} ${my_name}", "James David James"),
+    ("backslash in result",                 "x$('a\\\\nb')",                "xa\\nb"),
+    ("variable in expression result",       "$('$' + '{my_name}')",         "James"),
+    ("variable in inline result",           "a $('$' + '{my_name}') b",     "a James b"),
+    ("escape in expression result",         "$('\\\\$x')",                  "$x"),
+    ("escape before variable",              "$('\\\\')${my_name}",          "${my_name}"),
+    ("braces in expression result",         "x $({'a': 1}) ${my_name}",     "x {'a': 1} James"),
+    ("empty expression before variable",    "$()${my_int}",                 10),
+    ("empty expression after variable",     "${ints}$()",                   [0, 1, 2, 3]),
+    ("escape before unclosed variable",     "$('\\\\')${",                  "${"),
+    ("brace after variable char",           "$$('{my_name}')",              "James"),
+    ("colon in variable expression",        "${my_name$(':')x}",            "James"),
+    ("Two expressions",                     "$('${names.0.name}')-${names.1.name}-$(my_func(${my_int}))",
+                                            "James-David-20")
+]
+
+
+@pytest.mark.parametrize("name,string,expected", SUB_CASES)
 @pytest.mark.parametrize("g", [CustomGlobals, {k: getattr(CustomGlobals, k) for k in dir(CustomGlobals)}])
 @mock.patch("yamlscript.globals.uuid4", lambda: MOCK_UUID)
 @freezegun.freeze_time(MOCK_NOW)
@@ -151,3 +172,68 @@ def test_sub(name, string, expected, g, context):
     else:
         output = sub(string, context, g=g)
         assert output == expected, f"{name} : {output} != {expected}"
+
+
+def test_expression_cache(context):
+    expression_cache_clear()
+    sub(["$(my_func(1))", "$(my_func(1))", "$(my_func(2))"], context, g=CustomGlobals)
+    info = expression_cache_info()
+    assert (info.hits, info.misses) == (1, 2)
+
+
+@pytest.mark.parametrize("obj,expected", [
+    ({f"key_{i}": f"$(my_func({i}))" for i in range(20)},
+     {f"key_{i}": i * 2 for i in range(20)}),
+    ([{"name": "${names.%d.name}" % (i % 2), "i": "${ints.%d}" % (i % 4)} for i in range(20)],
+     [{"name": ["James", "David"][i % 2], "i": i % 4} for i in range(20)]),
+])
+def test_sub_workers(obj, expected, context, monkeypatch):
+    monkeypatch.setattr(parser, "PARALLEL_THRESHOLD", 10)
+    assert sub(obj, context, g=CustomGlobals, workers=2) == expected
+
+
+def test_sub_workers_error(context, monkeypatch):
+    monkeypatch.setattr(parser, "PARALLEL_THRESHOLD", 10)
+    with pytest.raises(ValueError):
+        sub(["${missing}"] * 10, context, g=CustomGlobals, workers=2)
+
+
+@pytest.mark.parametrize("share", [False, True])
+def test_sub_static_subtrees(share):
+    obj = {"static": {"a": ["b", 1, "\\${c}"], "d": (2, 3)}, "plain": ["x", {"y": 1}], "name": "${name}"}
+    output = sub(obj, {"name": "x"}, share=share)
+    assert output == {"static": {"a": ["b", 1, "${c}"], "d": [2, 3]}, "plain": ["x", {"y": 1}], "name": "x"}
+    assert (output["plain"] is obj["plain"]) is share
+    assert (output["plain"][1] is obj["plain"][1]) is share
+    assert output["static"] is not obj["static"]
+    assert output["static"]["a"] is not obj["static"]["a"]
+
+
+def test_sub_output_is_independent():
+    obj = {"db": {"opts": {"pool": 5}}, "name": "${n}"}
+    sub(obj, {"n": "a"})["db"]["opts"]["pool"] = 99
+    assert obj == {"db": {"opts": {"pool": 5}}, "name": "${n}"}
+
+
+@pytest.mark.parametrize("share", [False, True])
+def test_sub_static_document(share):
+    obj = ["a", {"b": "c"}]
+    output = sub(obj, share=share)
+    assert output == obj
+    assert (output is obj) is share
+
+
+def test_expression_assignment():
+    g = {k: getattr(CustomGlobals, k) for k in dir(CustomGlobals)}
+    assert sub("$((x := 1))") == 1
+    assert sub("$([y := 2, y + 1])", g=CustomGlobals) == [2, 3]
+    assert sub("$((x := 1))", g=g) == 1
+    assert "x" not in g
+
+
+def test_expression_cache_skips_long_sources(context, monkeypatch):
+    monkeypatch.setattr(parser, "EXPRESSION_CACHE_MAX_LENGTH", 10)
+    expression_cache_clear()
+    assert sub("$(sum(${ints}))", context) == 6
+    assert sub("$(1)", context) == 1
+    assert expression_cache_info().currsize == 1
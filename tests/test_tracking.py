@@ -0,0 +1,77 @@
+import copy
+
+import pytest
+
+from yamlscript import compile, track
+
+from .test_sub import CustomGlobals
+
+TEMPLATE = {
+    "name": "${my_name}",
+    "nested": {"name": "${my.name}", "all": "${my}"},
+    "double": "$(my_func(${my_int}))",
+    "first": "${names.0.name}",
+    "default": "${missing:${my_name}}",
+    "static": {"a": [1, 2]},
+    "dynamic": "${obj.$('name').string}",
+}
+
+
+@pytest.fixture
+def tracked(context):
+    return track(TEMPLATE, copy.deepcopy(context), g=CustomGlobals)
+
+
+def test_track_document(tracked):
+    assert tracked.document == {
+        "name": "James",
+        "nested": {"name": "David", "all": {"name": "David"}},
+        "double": 20,
+        "first": "James",
+        "default": "James",
+        "static": {"a": [1, 2]},
+        "dynamic": "David",
+    }
+
+
+@pytest.mark.parametrize(
+    "values,diff", [
+        ({"my_name": "Mike"},           ["/name", "/default"]),
+        ({"my/name": "Mike"},           ["/nested/name", "/nested/all"]),
+        ({"my": {"name": "Mike"}},      ["/nested/name", "/nested/all"]),
+        ({"my_int": 1},                 ["/double"]),
+        ({"names/0/name": "Mike"},      ["/first"]),
+        ({"names/1/name": "Mike"},      []),
+        ({"obj/name/string": "Mike"},   ["/dynamic"]),
+        ({"unused": 1},                 []),
+    ]
+)
+def test_track_update(tracked, values, diff):
+    before = copy.deepcopy(tracked.document)
+    old = tracked.document
+    document, changed = tracked.update(values)
+    assert sorted(changed) == sorted(diff)
+    assert document is tracked.document
+    assert old == before
+    assert document == compile(TEMPLATE, g=CustomGlobals).render(tracked.context)
+    assert document["static"] is old["static"]
+    if not diff:
+        assert document is old
+
+
+def test_track_update_template_value(tracked):
+    document, changed = tracked.update({"my_name": "${my.name}"})
+    assert changed == ["/name", "/default"]
+    assert document["name"] == "David"
+    document, changed = tracked.update({"my/name": "Mike"})
+    assert sorted(changed) == ["/default", "/name", "/nested/all", "/nested/name"]
+
+
+def test_track_whole_document(context):
+    tracked = track("${my_name}", copy.deepcopy(context))
+    assert tracked.update({"my_name": "Mike"}) == ("Mike", [""])
+
+
+def test_track_variable_in_expression_result():
+    tracked = track({"a": "$('$' + '{n}')"}, {"n": "x"})
+    assert tracked.update({"n": "y"}) == ({"a": "y"}, ["/a"])
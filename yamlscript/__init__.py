@@ -1,3 +1,60 @@
-from .globals import ExpressionGlobals
-from .loader import load
-from .parser import sub
+import importlib
+import sys
+from typing import TYPE_CHECKING, Any, List
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .aio import aload, aload_many
+    from .cache import RenderCache
+    from .compact import Compactor
+    from .compiler import CompiledTemplate, compile, render_many
+    from .globals import ExpressionGlobals
+    from .lazy import LazyMapping, LazySequence, lazy_sub
+    from .loader import Registry, iter_load, load
+    from .parser import expression_cache_clear, expression_cache_info, sub
+    from .profiling import Stats, profile
+    from .server import Client, Server, serve
+    from .stream import dump, iter_json
+    from .tracking import TrackedDocument, track
+
+_EXPORTS = {
+    "aload": "aio",
+    "aload_many": "aio",
+    "RenderCache": "cache",
+    "Compactor": "compact",
+    "CompiledTemplate": "compiler",
+    "compile": "compiler",
+    "render_many": "compiler",
+    "ExpressionGlobals": "globals",
+    "LazyMapping": "lazy",
+    "LazySequence": "lazy",
+    "lazy_sub": "lazy",
+    "Registry": "loader",
+    "iter_load": "loader",
+    "load": "loader",
+    "expression_cache_clear": "parser",
+    "expression_cache_info": "parser",
+    "sub": "parser",
+    "Stats": "profiling",
+    "profile": "profiling",
+    "Client": "server",
+    "Server": "server",
+    "serve": "server",
+    "dump": "stream",
+    "iter_json": "stream",
+    "TrackedDocument": "tracking",
+    "track": "tracking",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str) -> Any:
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{_EXPORTS[name]}", __name__), name)
+    setattr(sys.modules[__name__], name, value)
+    return value
+
+
+def __dir__() -> List[str]:
+    return sorted(set(vars(sys.modules[__name__])) | set(_EXPORTS))
@@ -0,0 +1,59 @@
+import asyncio
+import functools
+import pathlib
+from concurrent.futures import Executor
+from typing import Any, Dict, Iterable, List, Optional, Type, Union
+
+from . import globals, loader
+
+
+async def aload(
+    path: Union[pathlib.Path, str],
+    context: Optional[Dict[str, Any]] = None,
+    values: Optional[Dict[str, Any]] = None,
+    g: Union[Dict[str, Any], Type[Any]] = globals.ExpressionGlobals,
+    file_type: Optional[str] = None,
+    parse: bool = True,
+    executor: Optional[Executor] = None,
+    **kwargs: Any,
+) -> Any:
+    return await asyncio.get_running_loop().run_in_executor(
+        executor,
+        functools.partial(
+            loader.load,
+            path,
+            context=context,
+            values=values,
+            g=g,
+            file_type=file_type,
+            parse=parse,
+            **kwargs,
+        ),
+    )
+
+
+async def aload_many(
+    paths: Iterable[Union[pathlib.Path, str]],
+    context: Optional[Dict[str, Any]] = None,
+    values: Optional[Dict[str, Any]] = None,
+    g: Union[Dict[str, Any], Type[Any]] = globals.ExpressionGlobals,
+    file_type: Optional[str] = None,
+    parse: bool = True,
+    executor: Optional[Executor] = None,
+    limit: int = 8,
+    **kwargs: Any,
+) -> List[Any]:
+    semaphore = asyncio.Semaphore(limit)
+
+    async def _load(path: Union[pathlib.Path, str]) -> Any:
+        async with semaphore:
+            return await aload(
+                path, context, values, g, file_type, parse, executor, **kwargs
+            )
+
+    tasks = [asyncio.ensure_future(_load(path)) for path in paths]
+    try:
+        return await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,155 @@
+import hashlib
+import json
+import os
+import pathlib
+import pickle
+import re
+import tempfile
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple, Type, Union
+
+from . import globals, parser
+
+DEFAULT_MAX_SIZE = 64 * 1024 * 1024
+
+_IDENTIFIER = re.compile("[A-Za-z_][A-Za-z0-9_]*")
+_UNPICKLABLE = (pickle.PicklingError, TypeError, AttributeError)
+
+
+class RenderCache:
+    def __init__(
+        self,
+        directory: Union[pathlib.Path, str],
+        max_size: int = DEFAULT_MAX_SIZE,
+        rendered: bool = True,
+    ) -> None:
+        self.directory = pathlib.Path(directory)
+        self.max_size = max_size
+        self.rendered = rendered
+        self.hits = 0
+        self.misses = 0
+
+    def _file(self, key: str) -> pathlib.Path:
+        return self.directory / f"{key}.pickle"
+
+    def get(self, key: str) -> Any:
+        path = self._file(key)
+        try:
+            value = pickle.loads(path.read_bytes())
+        except (OSError, pickle.UnpicklingError, EOFError):
+            self.misses += 1
+            return parser.NULL
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        self.hits += 1
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        fd, temp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as stream:
+                pickle.dump(value, stream, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp, self._file(key))
+        except _UNPICKLABLE:
+            os.unlink(temp)
+            return
+        except BaseException:
+            os.unlink(temp)
+            raise
+        self._evict()
+
+    def clear(self) -> None:
+        for path in self.directory.glob("*.pickle"):
+            path.unlink(missing_ok=True)
+
+    def _entries(self) -> List[Tuple[os.stat_result, pathlib.Path]]:
+        entries = []
+        for path in self.directory.glob("*.pickle"):
+            try:
+                entries.append((path.stat(), path))
+            except FileNotFoundError:
+                continue
+        return entries
+
+    def size(self) -> int:
+        return sum(stat.st_size for stat, _ in self._entries())
+
+    def _evict(self) -> None:
+        entries = self._entries()
+        total = sum(stat.st_size for stat, _ in entries)
+        for stat, path in sorted(entries, key=lambda entry: entry[0].st_mtime_ns):
+            if total <= self.max_size:
+                break
+            path.unlink(missing_ok=True)
+            total -= stat.st_size
+
+
+def _digest(*parts: Any) -> str:
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part if isinstance(part, bytes) else str(part).encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def file_key(path: pathlib.Path, data: bytes, file_type: str, loader: Type[Any]) -> str:
+    stat = path.stat()
+    return _digest(
+        path,
+        stat.st_mtime_ns,
+        stat.st_size,
+        hashlib.sha256(data).hexdigest(),
+        file_type,
+        f"{loader.__module__}.{loader.__qualname__}",
+    )
+
+
+def context_key(context: Dict[str, Any]) -> Optional[str]:
+    try:
+        return _digest(json.dumps(context, sort_keys=True, default=repr))
+    except (TypeError, ValueError):
+        return None
+
+
+def globals_key(g: Union[Dict[str, Any], Type[Any]]) -> Optional[str]:
+    if isinstance(g, type):
+        return f"{g.__module__}.{g.__qualname__}"
+    return None
+
+
+def _strings(obj: Any) -> Iterable[str]:
+    if isinstance(obj, str):
+        yield obj
+    elif isinstance(obj, Mapping):
+        for value in obj.values():
+            yield from _strings(value)
+    elif isinstance(obj, Iterable):
+        for value in obj:
+            yield from _strings(value)
+
+
+def rendered_key(
+    key: str, context: Dict[str, Any], g: Union[Dict[str, Any], Type[Any]]
+) -> Optional[str]:
+    context_digest = context_key(context)
+    globals_digest = globals_key(g)
+    if context_digest is None or globals_digest is None:
+        return None
+    return _digest(key, context_digest, globals_digest)
+
+
+def is_deterministic(obj: Any, g: Union[Dict[str, Any], Type[Any]]) -> bool:
+    names = getattr(g, "_nondeterministic", globals.ExpressionGlobals._nondeterministic)
+    for string in _strings(obj):
+        if parser.SPECIAL_CHAR not in string:
+            continue
+        try:
+            expressions = parser._find_expressions(string)
+        except ValueError:
+            return False
+        for expression in expressions.values():
+            if any(name in names for name in _IDENTIFIER.findall(expression)):
+                return False
+    return True
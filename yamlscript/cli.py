@@ -1,13 +1,122 @@
-import fire
+import argparse
+import contextlib
+import functools
+import glob
+import itertools
 import pathlib
 import json
-from yamlscript import load
-from typing import Dict, Any
+import sys
+from yamlscript import load, loader, parser, profiling, stream
+from yamlscript.globals import ExpressionGlobals
+from typing import IO, Dict, Any, Iterable, Iterator, List, Optional, Union
 
 
-def yamlscript(path: pathlib.Path, values: Dict[str, Any] = None, file_type: str = None, no_parse: bool = False):
-    return json.dumps(load(path, context=values, file_type=file_type, parse=not no_parse))
+def _expand(paths: Iterable[Union[pathlib.Path, str]]) -> Iterator[str]:
+    for path in map(str, paths):
+        if glob.has_magic(path):
+            yield from sorted(glob.glob(path, recursive=True))
+        else:
+            yield path
 
 
-def main():
-    fire.Fire(yamlscript)
+def _render_file(path: str, values: Dict[str, Any], file_type: str, parse: bool) -> str:
+    try:
+        result = load(path, context=values, file_type=file_type, parse=parse)
+        return json.dumps({"path": path, "result": result})
+    except Exception as ex:
+        return json.dumps({"path": path, "error": {"type": type(ex).__name__, "message": str(ex)}})
+
+
+def _batch(paths: Iterable[str], render: Any, workers: int) -> Iterator[str]:
+    if workers <= 1:
+        yield from map(render, paths)
+        return
+    from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, as_completed, wait
+
+    with ProcessPoolExecutor(workers) as executor:
+        pending = set()
+        for path in paths:
+            pending.add(executor.submit(render, path))
+            if len(pending) >= workers * 4:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                yield from (future.result() for future in done)
+        yield from (future.result() for future in as_completed(pending))
+
+
+@contextlib.contextmanager
+def _open(output: str) -> Iterator[IO[str]]:
+    if output == "-":
+        yield sys.stdout
+        sys.stdout.flush()
+    else:
+        with open(output, "w") as stream:
+            yield stream
+
+
+def _is_batch(paths: Iterable[Union[pathlib.Path, str]], stdin: bool) -> bool:
+    paths = list(paths)
+    return stdin or len(paths) != 1 or glob.has_magic(str(paths[0]))
+
+
+def yamlscript(*paths: pathlib.Path, values: Dict[str, Any] = None, file_type: str = None, no_parse: bool = False, profile: bool = False, workers: int = 1, stdin: bool = False, output: str = None):
+    if _is_batch(paths, stdin):
+        if profile:
+            raise ValueError("--profile is only supported when rendering a single file")
+        sources = itertools.chain(paths, (line.strip() for line in sys.stdin if line.strip()) if stdin else ())
+        render = functools.partial(_render_file, values=values, file_type=file_type, parse=not no_parse)
+        with _open(output or "-") as out:
+            for line in _batch(_expand(sources), render, workers):
+                print(line, file=out, flush=True)
+        return None
+    registry = loader.Registry()
+    context = parser._context(values)
+    g = parser._globals(ExpressionGlobals)
+    with profiling.profile() as stats:
+        content = load(paths[0], file_type=file_type, parse=False, registry=registry)
+        with profiling.phase("dump"), loader._including(registry, context, g, loader._path(paths[0])):
+            chunks = stream.iter_json(content, context, g=g) if not no_parse else json.JSONEncoder().iterencode(content)
+            if output is None:
+                result = "".join(chunks)
+            else:
+                with _open(output) as out:
+                    out.writelines(chunks)
+                    out.write("\n")
+                result = None
+    if profile:
+        print(json.dumps(stats.as_dict(), indent=2), file=sys.stderr)
+    return result
+
+
+def _parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="yamlscript", description="Render yamlscript files as JSON.")
+    parser.add_argument("paths", nargs="*", help="files or glob patterns to render")
+    parser.add_argument("--values", type=json.loads, help="context as a JSON object")
+    parser.add_argument("--file_type", "--file-type", help="json, yaml or yml")
+    parser.add_argument("--no_parse", "--no-parse", action="store_true", help="skip substitution")
+    parser.add_argument("--profile", action="store_true", help="write timings to stderr")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes in batch mode")
+    parser.add_argument("--stdin", action="store_true", help="read more paths from stdin")
+    parser.add_argument("--output", "-o", default="-", help="file to write to, - for stdout")
+    return parser
+
+
+def _serve_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="yamlscript serve", description="Render JSON-lines requests with warm caches.")
+    parser.add_argument("--socket", help="unix socket to listen on instead of stdin/stdout")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ["serve"]:
+        from yamlscript import server
+
+        server.serve(_serve_parser().parse_args(argv[1:]).socket)
+        return
+    parser = _parser()
+    args = parser.parse_args(argv)
+    if not args.paths and not args.stdin:
+        parser.error("no paths given, pass files or glob patterns or use --stdin")
+    if args.profile and _is_batch(args.paths, args.stdin):
+        parser.error("--profile is only supported when rendering a single file")
+    yamlscript(*args.paths, values=args.values, file_type=args.file_type, no_parse=args.no_parse, profile=args.profile, workers=args.workers, stdin=args.stdin, output=args.output)
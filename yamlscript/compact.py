@@ -0,0 +1,108 @@
+import collections
+import sys
+import types
+from collections.abc import Iterable, Mapping
+from typing import Any, Dict, Optional, Set, Tuple, Union
+
+_EXACT = (str, int, bool, bytes, type(None))
+
+
+def _key(obj: Any) -> Any:
+    if type(obj) is float:
+        return float, obj.hex()
+    if type(obj) in _EXACT:
+        return type(obj), obj
+    return None
+
+
+def _size(obj: Any, seen: Set[int]) -> int:
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, Mapping):
+        if isinstance(obj, types.MappingProxyType):
+            size += sys.getsizeof(dict(obj))
+        for key, value in obj.items():
+            size += _size(key, seen) + _size(value, seen)
+    elif isinstance(obj, Iterable) and not isinstance(obj, (str, bytes)):
+        for item in obj:
+            size += _size(item, seen)
+    return size
+
+
+class Compactor:
+    def __init__(self, max_objects: Optional[int] = None) -> None:
+        self.max_objects = max_objects
+        self._table: "collections.OrderedDict[Any, Tuple[Any, int]]" = (
+            collections.OrderedDict()
+        )
+        self.size = 0
+        self.input_size = 0
+        self.references = 0
+
+    def _canonical(self, key: Any, obj: Any, size: int) -> Any:
+        self.references += 1
+        entry = self._table.get(key)
+        if entry is not None:
+            self._table.move_to_end(key)
+            return entry[0]
+        self._table[key] = (obj, size)
+        self.size += size
+        if self.max_objects is not None:
+            while len(self._table) > self.max_objects:
+                _, (_, evicted) = self._table.popitem(last=False)
+                self.size -= evicted
+        return obj
+
+    def _compact(self, obj: Any) -> Any:
+        if isinstance(obj, Mapping):
+            items = {
+                self._compact(key): self._compact(value) for key, value in obj.items()
+            }
+            key = (dict, tuple((id(k), id(v)) for k, v in items.items()))
+            if key in self._table:
+                return self._canonical(key, None, 0)
+            proxy = types.MappingProxyType(items)
+            return self._canonical(
+                key, proxy, sys.getsizeof(proxy) + sys.getsizeof(items)
+            )
+        if isinstance(obj, Iterable) and not isinstance(obj, (str, bytes)):
+            items = tuple(self._compact(item) for item in obj)
+            key = (tuple, tuple(id(item) for item in items))
+            return self._canonical(key, items, sys.getsizeof(items))
+        key = _key(obj)
+        if key is None:
+            return obj
+        return self._canonical(key, obj, sys.getsizeof(obj))
+
+    def compact(self, obj: Any) -> Any:
+        self.input_size += _size(obj, set())
+        return self._compact(obj)
+
+    @property
+    def saved(self) -> int:
+        return self.input_size - self.size
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "objects": len(self._table),
+            "references": self.references,
+            "input_size": self.input_size,
+            "size": self.size,
+            "saved": self.saved,
+        }
+
+    def clear(self) -> None:
+        self._table.clear()
+        self.size = self.input_size = self.references = 0
+
+
+def compact(obj: Any, compactor: Optional[Compactor] = None) -> Any:
+    return (compactor or Compactor()).compact(obj)
+
+
+def _compactor(option: Union[bool, Compactor]) -> Optional[Compactor]:
+    if isinstance(option, Compactor):
+        return option
+    return Compactor() if option else None
@@ -0,0 +1,440 @@
+import collections
+import functools
+import re
+import time
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    Union,
+)
+
+from . import globals, parser, profiling
+
+if TYPE_CHECKING:  # pragma: no cover
+    from concurrent.futures import Executor
+
+    from .compact import Compactor
+
+_Ref = Tuple[int, int, int]
+
+
+class _Variable:
+
+    __slots__ = ("path", "default")
+
+    def __init__(self, path: List[Any], default: Optional[List[Any]]) -> None:
+        self.path = path
+        self.default = default
+
+    def render(
+        self, context: Dict[str, Any], g: Dict[str, Any], results: Sequence[Any]
+    ) -> Any:
+        path = _join(self.path, context, g, results)
+        if not path:
+            return ""
+        value = parser._resolve(context, path)
+        if value is parser.NULL:
+            if self.default is None:
+                raise ValueError
+            return _join(self.default, context, g, results)
+        return _render_value(value, context, g)
+
+
+class _Expression:
+
+    __slots__ = ("source",)
+
+    def __init__(self, source: List[Any]) -> None:
+        self.source = source
+
+    def render(self, context: Dict[str, Any], g: Dict[str, Any]) -> Any:
+        source = _join(self.source, context, g, ())
+        if not source:
+            return ""
+        return parser._evaluate(str(source), g)
+
+
+class _String:
+
+    __slots__ = ("parts", "expressions", "string", "refs", "inner", "variable")
+
+    def __init__(
+        self,
+        parts: Optional[List[Any]],
+        expressions: List[_Expression],
+        string: str,
+        refs: List[_Ref],
+    ) -> None:
+        self.parts = parts
+        self.expressions = expressions
+        self.string = string
+        self.refs = refs
+        outer = collections.Counter(
+            part for part in parts or () if isinstance(part, int)
+        )
+        self.inner = set(collections.Counter(ref[2] for ref in refs) - outer)
+        variables = [part for part in parts or () if not isinstance(part, int)]
+        self.variable = (
+            variables[0]
+            if len(variables) == 1 and isinstance(variables[0], _Variable)
+            else None
+        )
+
+    def _splice(self, texts: List[str]) -> str:
+        pieces: List[str] = []
+        position = 0
+        for start, end, index in self.refs:
+            pieces.append(self.string[position:start])
+            pieces.append(texts[index])
+            position = end
+        pieces.append(self.string[position:])
+        return "".join(pieces)
+
+    def _rescan(self, texts: List[str]) -> bool:
+        for index, text in enumerate(texts):
+            if index in self.inner:
+                if _RESCAN.search(text):
+                    return True
+            elif (
+                parser.SPECIAL_CHAR in text
+                or text.endswith(parser.ESCAPE_CHAR)
+                or text.startswith(parser.VARIABLE_SCOPE[0])
+            ):
+                return True
+        return False
+
+    def render(self, context: Dict[str, Any], g: Dict[str, Any]) -> Any:
+        results = [expression.render(context, g) for expression in self.expressions]
+        if self.parts is None:
+            texts = [str(parser._dump_i(result)) for result in results]
+            return _finish(parser._sub_variables(self._splice(texts), context, g))
+        if len(self.parts) == 1 and isinstance(self.parts[0], int):
+            value = parser._dump_i(results[self.parts[0]])
+            if isinstance(value, str) and parser.SPECIAL_CHAR in value:
+                return _finish(parser._sub_variables(value, context, g))
+            return value
+        texts = [str(parser._dump_i(result)) for result in results]
+        if self._rescan(texts):
+            return _finish(parser._sub_variables(self._splice(texts), context, g))
+        if self.variable is not None and not any(texts):
+            return _finish(_join([self.variable], context, g, texts))
+        return _finish(_join(self.parts, context, g, texts))
+
+
+class _Constant:
+
+    __slots__ = ("value",)
+
+    def __init__(self, value: Any) -> None:
+        self.value = value
+
+    def render(self, context: Dict[str, Any], g: Dict[str, Any]) -> Any:
+        return self.value
+
+
+class _Static:
+
+    __slots__ = ("value", "share")
+
+    def __init__(self, value: Any, share: bool) -> None:
+        self.value = value
+        self.share = share
+
+    def render(self, context: Dict[str, Any], g: Dict[str, Any]) -> Any:
+        return self.value if self.share else parser._copy(self.value)
+
+
+class _Mapping:
+
+    __slots__ = ("items",)
+
+    def __init__(self, items: List[Tuple[Any, Any]]) -> None:
+        self.items = items
+
+    def render(self, context: Dict[str, Any], g: Dict[str, Any]) -> Dict[Any, Any]:
+        return {key: node.render(context, g) for key, node in self.items}
+
+
+class _Sequence:
+
+    __slots__ = ("items",)
+
+    def __init__(self, items: List[Any]) -> None:
+        self.items = items
+
+    def render(self, context: Dict[str, Any], g: Dict[str, Any]) -> List[Any]:
+        return [node.render(context, g) for node in self.items]
+
+
+def _join(
+    parts: List[Any], context: Dict[str, Any], g: Dict[str, Any], results: Sequence[Any]
+) -> Any:
+    if len(parts) == 1 and isinstance(parts[0], _Variable):
+        return parser._dump_i(parts[0].render(context, g, results))
+    out: List[str] = []
+    for part in parts:
+        if isinstance(part, str):
+            out.append(part)
+        elif isinstance(part, int):
+            out.append(str(parser._dump_i(results[part])))
+        else:
+            out.append(str(parser._dump_i(part.render(context, g, results))))
+    return "".join(out)
+
+
+_RESCAN = re.compile(r"[$\\{}:]")
+
+
+def _finish(value: Any) -> Any:
+    if isinstance(value, str):
+        return value.replace(
+            parser.ESCAPE_CHAR + parser.SPECIAL_CHAR, parser.SPECIAL_CHAR
+        )
+    return value
+
+
+def _literal(string: str, unescape: bool) -> str:
+    if unescape:
+        return string.replace(
+            parser.ESCAPE_CHAR + parser.SPECIAL_CHAR, parser.SPECIAL_CHAR
+        )
+    return string
+
+
+def _compile_parts(
+    string: str,
+    masked: str,
+    start: int,
+    end: int,
+    refs: Iterable[_Ref],
+    variables: bool,
+    unescape: bool,
+) -> List[Any]:
+    sites: List[Tuple[int, int, Any]] = []
+    if variables:
+        for variable_start, variable_end in parser._variable_spans(masked[start:end]):
+            variable_start, variable_end = variable_start + start, variable_end + start
+            variable = _compile_variable(
+                string, masked, variable_start, variable_end, refs
+            )
+            sites.append((variable_start, variable_end, variable))
+    for ref_start, ref_end, index in refs:
+        if ref_start < start or ref_end > end:
+            continue
+        if any(s <= ref_start < e for s, e, _ in sites):
+            continue
+        sites.append((ref_start, ref_end, index))
+    sites.sort(key=lambda site: site[0])
+
+    parts: List[Any] = []
+    position = start
+    for site_start, site_end, part in sites:
+        if site_start > position:
+            parts.append(_literal(string[position:site_start], unescape))
+        parts.append(part)
+        position = site_end
+    if position < end:
+        parts.append(_literal(string[position:end], unescape))
+    return parts
+
+
+def _compile_variable(
+    string: str, masked: str, start: int, end: int, refs: Iterable[_Ref]
+) -> _Variable:
+    start, end = start + len(parser.SPECIAL_CHAR) + 1, end - 1
+    separator = masked.find(":", start, end)
+    if separator == -1:
+        return _Variable(
+            _compile_parts(string, masked, start, end, refs, False, False), None
+        )
+    return _Variable(
+        _compile_parts(string, masked, start, separator, refs, False, False),
+        _compile_parts(string, masked, separator + 1, end, refs, True, True),
+    )
+
+
+def _compile_expression(source: str) -> _Expression:
+    source = parser._NESTED_EXPRESSION.sub(parser.EXPRESSION_SCOPE[0], source)
+    return _Expression(_compile_parts(source, source, 0, len(source), (), True, False))
+
+
+def _compile_string(string: str) -> Union[str, _String]:
+    if parser.SPECIAL_CHAR not in string:
+        return string
+    offset = len(parser.SPECIAL_CHAR) + 1
+    masked = string
+    expressions: List[_Expression] = []
+    indexes: Dict[str, int] = {}
+    refs: List[_Ref] = []
+    for start, end in parser._expression_spans(string):
+        pattern = string[start:end]
+        if pattern not in indexes:
+            indexes[pattern] = len(expressions)
+            expressions.append(_compile_expression(pattern[offset:-1]))
+        refs.append((start, end, indexes[pattern]))
+        masked = masked[:start] + " " * (end - start) + masked[end:]
+
+    try:
+        parts = _compile_parts(string, masked, 0, len(string), refs, True, False)
+    except ValueError:
+        if not refs:
+            raise
+        return _String(None, expressions, string, refs)
+    if all(isinstance(part, str) for part in parts):
+        return _finish("".join(parts))
+    return _String(parts, expressions, string, refs)
+
+
+_compile_value = functools.lru_cache(maxsize=1024)(_compile_string)
+
+
+def _render_value(value: Any, context: Dict[str, Any], g: Dict[str, Any]) -> Any:
+    if isinstance(value, str):
+        node = _compile_value(value)
+        return node if isinstance(node, str) else node.render(context, g)
+    if isinstance(value, Mapping):
+        return {key: _render_value(item, context, g) for key, item in value.items()}
+    if isinstance(value, Iterable):
+        return [_render_value(item, context, g) for item in value]
+    return value
+
+
+def _is_static(node: Any) -> bool:
+    return isinstance(node, (_Constant, _Static))
+
+
+def _compile_i(item: Any, share: bool) -> Any:
+    if isinstance(item, str):
+        node = _compile_string(item)
+        return _Constant(node) if isinstance(node, str) else node
+    if isinstance(item, Mapping):
+        items = [(key, _compile_i(value, share)) for key, value in item.items()]
+        if all(_is_static(node) for _, node in items):
+            return _Static({key: node.value for key, node in items}, share)
+        return _Mapping(items)
+    if isinstance(item, Iterable):
+        nodes = [_compile_i(value, share) for value in item]
+        if all(_is_static(node) for node in nodes):
+            return _Static([node.value for node in nodes], share)
+        return _Sequence(nodes)
+    return _Constant(item)
+
+
+def _render_profiled(
+    node: Any,
+    context: Dict[str, Any],
+    g: Dict[str, Any],
+    stats: profiling.Stats,
+    pointer: str,
+) -> Any:
+    if isinstance(node, _String):
+        start = time.perf_counter()
+        value = node.render(context, g)
+        stats.add_path(pointer, time.perf_counter() - start)
+        return value
+    if isinstance(node, _Mapping):
+        return {
+            key: _render_profiled(
+                item, context, g, stats, f"{pointer}/{parser._escape_key(key)}"
+            )
+            for key, item in node.items
+        }
+    if isinstance(node, _Sequence):
+        return [
+            _render_profiled(item, context, g, stats, f"{pointer}/{index}")
+            for index, item in enumerate(node.items)
+        ]
+    return node.render(context, g)
+
+
+class CompiledTemplate:
+    def __init__(self, root: Any, g: Dict[str, Any]) -> None:
+        self._root = root
+        self._g = g
+
+    def render(
+        self,
+        context: Dict[str, Any] = None,
+        values: Dict[str, Any] = None,
+        compact: Union[bool, "Compactor"] = False,
+    ) -> Any:
+        context = parser._context(context, values)
+        stats = profiling._active.get()
+        if stats is None:
+            out = self._root.render(context, self._g)
+        else:
+            with profiling.phase("render"):
+                out = _render_profiled(self._root, context, self._g, stats, "")
+        return parser._compact(out, compact)
+
+
+def compile(
+    obj: Any,
+    g: Union[Dict[str, Any], Type[Any]] = globals.ExpressionGlobals,
+    share: bool = False,
+) -> CompiledTemplate:
+    with profiling.phase("compile"):
+        return CompiledTemplate(_compile_i(obj, share), parser._globals(g))
+
+
+_worker: Dict[str, Any] = {}
+
+
+def _init_worker(template: CompiledTemplate, values: Optional[Dict[str, Any]]) -> None:
+    _worker["template"] = template
+    _worker["values"] = values
+
+
+def _render_worker(context: Dict[str, Any]) -> Any:
+    return _worker["template"].render(context, _worker["values"])
+
+
+def _imap(
+    executor: "Executor",
+    func: Callable[[Any], Any],
+    iterable: Iterable[Any],
+    window: int,
+) -> Iterator[Any]:
+    with executor:
+        pending: Deque[Any] = collections.deque()
+        for item in iterable:
+            pending.append(executor.submit(func, item))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def render_many(
+    template: Any,
+    contexts: Iterable[Dict[str, Any]],
+    values: Optional[Dict[str, Any]] = None,
+    g: Union[Dict[str, Any], Type[Any]] = globals.ExpressionGlobals,
+    workers: int = 1,
+    processes: bool = False,
+    share: bool = False,
+) -> Iterator[Any]:
+    if not isinstance(template, CompiledTemplate):
+        template = compile(template, g, share)
+    if workers <= 1:
+        return (template.render(context, values) for context in contexts)
+    from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+    if processes:
+        executor: "Executor" = ProcessPoolExecutor(
+            workers, initializer=_init_worker, initargs=(template, values)
+        )
+        return _imap(executor, _render_worker, contexts, workers * 4)
+    render = functools.partial(template.render, values=values)
+    return _imap(ThreadPoolExecutor(workers), render, contexts, workers * 4)
@@ -1,11 +1,119 @@
+import bisect
+import functools
+import itertools
+import math
+import operator
+import weakref
 from datetime import date, datetime, timedelta, timezone
-from typing import Any, Callable, Iterable, Optional, Tuple, Union
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    NoReturn,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
 from uuid import uuid4
 
-from dateutil.relativedelta import relativedelta
+if TYPE_CHECKING:  # pragma: no cover
+    from dateutil.relativedelta import relativedelta
 
 
-class ExpressionGlobals:
+def _relativedelta(**kwargs: int) -> "relativedelta":
+    from dateutil.relativedelta import relativedelta
+
+    return relativedelta(**kwargs)
+
+
+VECTORIZE_THRESHOLD = 1024
+
+_Number = Union[int, float]
+
+
+@functools.lru_cache(maxsize=None)
+def _numpy() -> Any:
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def _values(iterable: Iterable[Any]) -> Sequence[Any]:
+    return iterable if isinstance(iterable, (list, tuple)) else list(iterable)
+
+
+def _vectorize(values: Sequence[Any]) -> Any:
+    return _numpy() if len(values) >= VECTORIZE_THRESHOLD else None
+
+
+def _percentile(ordered: Sequence[_Number], q: _Number) -> float:
+    if not 0 <= q <= 100:
+        raise ValueError("percentiles must be in the range [0, 100]")
+    position = (len(ordered) - 1) * q / 100
+    lower = math.floor(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return float(
+        ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+    )
+
+
+def _elementwise(op: Callable[[Any, Any], Any], a: Any, b: Any) -> Any:
+    scalar_a, scalar_b = isinstance(a, (int, float)), isinstance(b, (int, float))
+    if scalar_a and scalar_b:
+        return op(a, b)
+    left = itertools.repeat(a) if scalar_a else _values(a)
+    right = itertools.repeat(b) if scalar_b else _values(b)
+    if not scalar_a and not scalar_b and len(left) != len(right):
+        raise ValueError("operands must have the same length")
+    return list(map(op, left, right))
+
+
+class Namespace(dict):  # type: ignore
+    def _read_only(self, *args: Any, **kwargs: Any) -> NoReturn:
+        raise TypeError("globals namespace is read-only")
+
+    __setitem__ = __delitem__ = __ior__ = _read_only  # type: ignore
+    clear = pop = popitem = setdefault = update = _read_only  # type: ignore
+
+    def __reduce__(self) -> Any:
+        return Namespace, (dict(self),)
+
+
+_NAMESPACES: "weakref.WeakKeyDictionary[type, Namespace]" = weakref.WeakKeyDictionary()
+
+
+def build_namespace(obj: Any, exclude: Iterable[str] = ()) -> Dict[str, Any]:
+    return {
+        key: getattr(obj, key)
+        for key in dir(obj)
+        if (not key.startswith("_") or key == "__builtins__") and key not in exclude
+    }
+
+
+class _GlobalsMeta(type):
+    def __setattr__(cls, name: str, value: Any) -> None:
+        super().__setattr__(name, value)
+        cls._invalidate()
+
+    def __delattr__(cls, name: str) -> None:
+        super().__delattr__(name)
+        cls._invalidate()
+
+    def _invalidate(cls) -> None:
+        stack = [cls]
+        while stack:
+            klass = stack.pop()
+            _NAMESPACES.pop(klass, None)
+            stack.extend(klass.__subclasses__())
+
+
+class ExpressionGlobals(metaclass=_GlobalsMeta):
 
     __builtins__ = {
         "bool": str,
@@ -16,9 +124,23 @@ class ExpressionGlobals:
         "str": str,
     }
 
+    _nondeterministic = ("include", "now", "today", "uuid")
+
     @classmethod
-    def days(cls, num: int) -> relativedelta:
-        return relativedelta(days=num)
+    def namespace(cls) -> Namespace:
+        namespace = _NAMESPACES.get(cls)
+        if namespace is None:
+            namespace = Namespace(build_namespace(cls, exclude=("namespace",)))
+            _NAMESPACES[cls] = namespace
+        return namespace
+
+    @classmethod
+    def add(cls, a: Any, b: Any) -> Any:
+        return _elementwise(operator.add, a, b)
+
+    @classmethod
+    def days(cls, num: int) -> "relativedelta":
+        return _relativedelta(days=num)
 
     @classmethod
     def datetime(
@@ -60,6 +182,10 @@ class ExpressionGlobals:
             return date.fromisoformat(string)
         return date(year=year, month=month, day=day)
 
+    @classmethod
+    def divide(cls, a: Any, b: Any) -> Any:
+        return _elementwise(operator.truediv, a, b)
+
     @classmethod
     def enumerate(cls, iterable: Iterable[Any]) -> Iterable[Tuple[int, Any]]:
         return enumerate(iterable)
@@ -71,8 +197,61 @@ class ExpressionGlobals:
         return filter(func, iterable)
 
     @classmethod
-    def hours(cls, num: int) -> relativedelta:
-        return relativedelta(hours=num)
+    def group_sum(
+        cls, records: Iterable[Dict[str, Any]], key: str, value: str
+    ) -> Dict[Any, _Number]:
+        out: Dict[Any, _Number] = {}
+        for record in records:
+            group = record[key]
+            out[group] = out.get(group, 0) + record[value]
+        return out
+
+    @classmethod
+    def histogram(
+        cls,
+        iterable: Iterable[_Number],
+        bins: Union[int, Iterable[_Number]] = 10,
+        bounds: Optional[Tuple[_Number, _Number]] = None,
+    ) -> Dict[str, List[Any]]:
+        values = _values(iterable)
+        numpy = _vectorize(values)
+        if numpy is not None:
+            counts, edges = numpy.histogram(
+                numpy.asarray(values, dtype=float), bins=bins, range=bounds
+            )
+            return {"counts": counts.tolist(), "edges": edges.tolist()}
+        if isinstance(bins, int):
+            if bins < 1:
+                raise ValueError("bins must be a positive integer")
+            if bounds is None:
+                bounds = (min(values), max(values)) if values else (0, 1)
+            first, last = float(bounds[0]), float(bounds[1])
+            if first > last:
+                raise ValueError("max must be larger than min in bounds")
+            if first == last:
+                first, last = first - 0.5, last + 0.5
+            step = (last - first) / bins
+            edges = [first + index * step for index in range(bins)] + [last]
+        else:
+            edges = [float(edge) for edge in bins]
+            if len(edges) < 2 or any(a > b for a, b in zip(edges, edges[1:])):
+                raise ValueError("bins must increase monotonically")
+        counts = [0] * (len(edges) - 1)
+        for value in values:
+            if edges[0] <= value <= edges[-1]:
+                index = bisect.bisect_right(edges, value) - 1
+                counts[min(index, len(counts) - 1)] += 1
+        return {"counts": counts, "edges": edges}
+
+    @classmethod
+    def hours(cls, num: int) -> "relativedelta":
+        return _relativedelta(hours=num)
+
+    @classmethod
+    def include(cls, path: str, file_type: Optional[str] = None) -> Any:
+        from . import loader
+
+        return loader.include(path, file_type)
 
     @classmethod
     def map(
@@ -85,28 +264,61 @@ class ExpressionGlobals:
         return max(iterable)
 
     @classmethod
-    def microseconds(cls, num: int) -> relativedelta:
-        return relativedelta(microseconds=num)
+    def mean(cls, iterable: Iterable[_Number]) -> float:
+        values = _values(iterable)
+        if not values:
+            raise ValueError("mean() of empty data")
+        return math.fsum(values) / len(values)
+
+    @classmethod
+    def microseconds(cls, num: int) -> "relativedelta":
+        return _relativedelta(microseconds=num)
 
     @classmethod
     def min(cls, iterable: Iterable[Union[int, float]],) -> Union[int, float]:
         return min(iterable)
 
     @classmethod
-    def minutes(cls, num: int) -> relativedelta:
-        return relativedelta(minutes=num)
+    def minutes(cls, num: int) -> "relativedelta":
+        return _relativedelta(minutes=num)
 
     @classmethod
-    def months(cls, num: int) -> relativedelta:
-        return relativedelta(months=num)
+    def months(cls, num: int) -> "relativedelta":
+        return _relativedelta(months=num)
+
+    @classmethod
+    def multiply(cls, a: Any, b: Any) -> Any:
+        return _elementwise(operator.mul, a, b)
 
     @classmethod
     def now(cls) -> datetime:
         return datetime.utcnow()
 
     @classmethod
-    def seconds(cls, num: int) -> relativedelta:
-        return relativedelta(seconds=num)
+    def percentile(
+        cls, iterable: Iterable[_Number], q: Union[_Number, Iterable[_Number]]
+    ) -> Union[float, List[float]]:
+        values = _values(iterable)
+        if not values:
+            raise ValueError("percentile() of empty data")
+        numpy = _vectorize(values)
+        if numpy is not None:
+            result: Union[float, List[float]] = numpy.percentile(
+                numpy.asarray(values, dtype=float), q
+            ).tolist()
+            return result
+        ordered = sorted(values)
+        if isinstance(q, (int, float)):
+            return _percentile(ordered, q)
+        return [_percentile(ordered, item) for item in q]
+
+    @classmethod
+    def seconds(cls, num: int) -> "relativedelta":
+        return _relativedelta(seconds=num)
+
+    @classmethod
+    def subtract(cls, a: Any, b: Any) -> Any:
+        return _elementwise(operator.sub, a, b)
 
     @classmethod
     def sum(cls, iterable: Iterable[Union[int, float]]) -> Union[int, float]:
@@ -123,9 +335,9 @@ class ExpressionGlobals:
         return str(uuid4())
 
     @classmethod
-    def weeks(cls, num: int) -> relativedelta:
-        return relativedelta(weeks=num)
+    def weeks(cls, num: int) -> "relativedelta":
+        return _relativedelta(weeks=num)
 
     @classmethod
-    def years(cls, num: int) -> relativedelta:
-        return relativedelta(years=num)
+    def years(cls, num: int) -> "relativedelta":
+        return _relativedelta(years=num)
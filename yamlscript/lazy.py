@@ -0,0 +1,98 @@
+from typing import Any, Dict, Iterator, List, Mapping, Sequence, Type, Union
+
+from . import globals, parser
+
+
+class LazyMapping(Mapping[Any, Any]):
+    def __init__(
+        self, obj: Mapping[Any, Any], context: Dict[str, Any], g: Dict[str, Any]
+    ):
+        self._obj = obj
+        self._context = context
+        self._g = g
+        self._cache: Dict[Any, Any] = {}
+
+    def __getitem__(self, key: Any) -> Any:
+        if key in self._cache:
+            return self._cache[key]
+        value = _render(self._obj[key], self._context, self._g)
+        self._cache[key] = value
+        return value
+
+    def __contains__(self, key: Any) -> bool:
+        return key in self._obj
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        return self[key] if key in self._obj else default
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self._obj)
+
+    def __len__(self) -> int:
+        return len(self._obj)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({list(self._obj)!r})"
+
+    def materialize(self) -> Dict[Any, Any]:
+        return {key: _materialize(self[key]) for key in self._obj}
+
+
+class LazySequence(Sequence[Any]):
+    def __init__(self, obj: Sequence[Any], context: Dict[str, Any], g: Dict[str, Any]):
+        self._obj = obj
+        self._context = context
+        self._g = g
+        self._cache: Dict[int, Any] = {}
+
+    def __getitem__(self, index: Any) -> Any:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self._obj)))]
+        if index < 0:
+            index += len(self._obj)
+            if index < 0:
+                raise IndexError("sequence index out of range")
+        if index in self._cache:
+            return self._cache[index]
+        value = _render(self._obj[index], self._context, self._g)
+        self._cache[index] = value
+        return value
+
+    def __len__(self) -> int:
+        return len(self._obj)
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, Sequence) and not isinstance(other, str):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}(<{len(self._obj)} items>)"
+
+    def materialize(self) -> List[Any]:
+        return [_materialize(item) for item in self]
+
+
+def _render(value: Any, context: Dict[str, Any], g: Dict[str, Any]) -> Any:
+    if isinstance(value, str):
+        return parser._sub_string(value, context, g)
+    if isinstance(value, Mapping):
+        return LazyMapping(value, context, g)
+    if isinstance(value, Sequence):
+        return LazySequence(value, context, g)
+    return parser._sub_i(value, context, g)
+
+
+def _materialize(value: Any) -> Any:
+    if isinstance(value, (LazyMapping, LazySequence)):
+        return value.materialize()
+    return value
+
+
+def lazy_sub(
+    obj: Any,
+    context: Dict[str, Any] = None,
+    values: Dict[str, Any] = None,
+    g: Union[Dict[str, Any], Type[Any]] = globals.ExpressionGlobals,
+) -> Any:
+    return _render(obj, parser._context(context, values), parser._globals(g))
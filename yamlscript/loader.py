@@ -1,35 +1,278 @@
+import contextlib
 import json
+import os
 import pathlib
-from typing import Any, Dict, Optional, Type, Union
+from contextvars import ContextVar
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Type,
+    Union,
+)
 
-import yaml
+from . import globals
+from . import lazy as lazy_render
+from . import parser, profiling
 
-from . import globals, parser
+if TYPE_CHECKING:  # pragma: no cover
+    from . import cache as render_cache
+    from .compact import Compactor
 
 
-def load(
-    path: Union[pathlib.Path, str],
-    context: Optional[Dict[str, Any]] = None,
-    values: Optional[Dict[str, Any]] = None,
-    g: Union[Dict[str, Any], Type[Any]] = globals.ExpressionGlobals,
-    file_type: Optional[str] = None,
-    parse: bool = True,
-) -> Dict[str, Any]:
+def default_loader() -> Type[Any]:
+    import yaml
+
+    return getattr(yaml, "CSafeLoader", yaml.SafeLoader)  # type: ignore
+
+
+def _path(path: Union[pathlib.Path, str]) -> pathlib.Path:
     path = pathlib.Path(path).absolute()
     if not path.is_file():
         raise Exception
+    return path
+
+
+def _file_type(path: pathlib.Path, file_type: Optional[str]) -> str:
     if file_type is None:
         parts = path.name.split(".")
         if len(parts) == 1:
             raise Exception
         file_type = parts[-1]
-    if file_type == "json":
-        content: Dict[str, Any] = json.loads(path.read_text())
-    elif file_type in ("yaml", "yml"):
-        content = yaml.safe_load(path.read_text())
-    else:
+    if file_type not in ("json", "yaml", "yml"):
         raise NotImplementedError
+    return file_type
+
+
+def _read(text: str, file_type: str, loader: Type[Any]) -> Any:
+    if file_type == "json":
+        return json.loads(text)
+    import yaml
+
+    return yaml.load(text, Loader=loader)
+
+
+class Registry:
+    def __init__(self, loader: Optional[Type[Any]] = None) -> None:
+        self.loader = loader
+        self.reads = 0
+        self._documents: Dict[Tuple[str, str], Tuple[Tuple[int, int], Any]] = {}
+
+    def get(
+        self, path: pathlib.Path, file_type: str, loader: Optional[Type[Any]] = None
+    ) -> Any:
+        stat = path.stat()
+        key = (str(path), file_type)
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        entry = self._documents.get(key)
+        if entry is None or entry[0] != stamp:
+            with profiling.phase("read"):
+                text = path.read_text()
+            with profiling.phase("parse"):
+                content = _read(
+                    text, file_type, loader or self.loader or default_loader()
+                )
+            self.reads += 1
+            entry = self._documents[key] = (stamp, content)
+        return entry[1]
+
+    def clear(self) -> None:
+        self._documents.clear()
+
+
+class _Frame(NamedTuple):
+    registry: Registry
+    context: Dict[str, Any]
+    g: Dict[str, Any]
+    stack: Tuple[pathlib.Path, ...]
+
+
+_frame: ContextVar[Optional[_Frame]] = ContextVar("yamlscript_include", default=None)
+
+
+@contextlib.contextmanager
+def _including(
+    registry: Registry,
+    context: Dict[str, Any],
+    g: Dict[str, Any],
+    path: Optional[pathlib.Path],
+) -> Iterator[None]:
+    token = _frame.set(_Frame(registry, context, g, (path,) if path else ()))
+    try:
+        yield
+    finally:
+        _frame.reset(token)
+
+
+def include(path: Union[pathlib.Path, str], file_type: Optional[str] = None) -> Any:
+    frame = _frame.get()
+    if frame is None:
+        raise ValueError("include() can only be used while loading a file")
+    base = frame.stack[-1].parent if frame.stack else pathlib.Path.cwd()
+    path = _path(os.path.normpath(base / path))
+    if path in frame.stack:
+        cycle = " -> ".join(str(item) for item in frame.stack + (path,))
+        raise ValueError(f"include cycle: {cycle}")
+    content = frame.registry.get(path, _file_type(path, file_type))
+    token = _frame.set(frame._replace(stack=frame.stack + (path,)))
+    try:
+        return parser._sub_i(content, frame.context, frame.g)
+    finally:
+        _frame.reset(token)
+
+
+def _load_cached(
+    cache: "render_cache.RenderCache",
+    path: pathlib.Path,
+    file_type: str,
+    loader: Type[Any],
+    context: Optional[Dict[str, Any]],
+    values: Optional[Dict[str, Any]],
+    g: Union[Dict[str, Any], Type[Any]],
+    parse: bool,
+    workers: int,
+) -> Any:
+    from . import cache as render_cache
+
+    with profiling.phase("read"):
+        data = path.read_bytes()
+    key = render_cache.file_key(path, data, file_type, loader)
+    entry = cache.get(key)
+    if entry is parser.NULL:
+        with profiling.phase("parse"):
+            content = _read(data.decode(), file_type, loader)
+        entry = (content, render_cache.is_deterministic(content, g))
+        cache.set(key, entry)
+    content, deterministic = entry
     if not parse:
         return content
-    out: Dict[str, Any] = parser.sub(content, context, values, g)
+
+    context = parser._context(context, values)
+    rendered_key = None
+    if cache.rendered and deterministic and render_cache.is_deterministic(context, g):
+        rendered_key = render_cache.rendered_key(key, context, g)
+    if rendered_key is not None:
+        out = cache.get(rendered_key)
+        if out is not parser.NULL:
+            return out
+    out = parser.sub(content, context, g=g, workers=workers)
+    if rendered_key is not None:
+        cache.set(rendered_key, out)
     return out
+
+
+def load(
+    path: Union[pathlib.Path, str],
+    context: Optional[Dict[str, Any]] = None,
+    values: Optional[Dict[str, Any]] = None,
+    g: Union[Dict[str, Any], Type[Any]] = globals.ExpressionGlobals,
+    file_type: Optional[str] = None,
+    parse: bool = True,
+    loader: Optional[Type[Any]] = None,
+    workers: int = 1,
+    cache: Union["render_cache.RenderCache", pathlib.Path, str, None] = None,
+    lazy: bool = False,
+    registry: Optional[Registry] = None,
+    compact: Union[bool, "Compactor"] = False,
+) -> Dict[str, Any]:
+    if lazy and compact is not False:
+        raise ValueError("compact output cannot be combined with lazy=True")
+    path = _path(path)
+    file_type = _file_type(path, file_type)
+    loader = loader or default_loader()
+    registry = registry if registry is not None else Registry(loader)
+    context = parser._context(context, values)
+    with _including(registry, context, parser._globals(g), path):
+        out = _load(
+            path, file_type, loader, context, g, parse, workers, cache, lazy, registry
+        )
+    return parser._compact(out, compact)
+
+
+def _load(
+    path: pathlib.Path,
+    file_type: str,
+    loader: Type[Any],
+    context: Dict[str, Any],
+    g: Union[Dict[str, Any], Type[Any]],
+    parse: bool,
+    workers: int,
+    cache: Union["render_cache.RenderCache", pathlib.Path, str, None],
+    lazy: bool,
+    registry: Registry,
+) -> Any:
+    if cache is not None:
+        from . import cache as render_cache
+
+        if not isinstance(cache, render_cache.RenderCache):
+            cache = render_cache.RenderCache(cache)
+        if not lazy:
+            return _load_cached(
+                cache, path, file_type, loader, context, None, g, parse, workers
+            )
+        content = _load_cached(
+            cache, path, file_type, loader, context, None, g, False, workers
+        )
+    else:
+        content = registry.get(path, file_type, loader)
+        if not parse:
+            return parser._copy(content)
+    if not parse:
+        return content
+    if lazy:
+        return lazy_render.lazy_sub(content, context, None, g)
+    return parser.sub(content, context, None, g, workers=workers)
+
+
+def _iter_documents(
+    path: pathlib.Path,
+    file_type: str,
+    context: Dict[str, Any],
+    g: Dict[str, Any],
+    parse: bool,
+    loader: Type[Any],
+    registry: Registry,
+) -> Iterator[Any]:
+    with path.open() as stream:
+        if file_type == "json":
+            documents: Iterable[Any] = [json.load(stream)]
+        else:
+            import yaml
+
+            documents = yaml.load_all(stream, Loader=loader)
+        for document in documents:
+            if not parse:
+                yield document
+                continue
+            with _including(registry, context, g, path):
+                out = parser.sub(document, context, g=g)
+            yield out
+
+
+def iter_load(
+    path: Union[pathlib.Path, str],
+    context: Optional[Dict[str, Any]] = None,
+    values: Optional[Dict[str, Any]] = None,
+    g: Union[Dict[str, Any], Type[Any]] = globals.ExpressionGlobals,
+    file_type: Optional[str] = None,
+    parse: bool = True,
+    loader: Optional[Type[Any]] = None,
+    registry: Optional[Registry] = None,
+) -> Iterator[Any]:
+    path = _path(path)
+    file_type = _file_type(path, file_type)
+    loader = loader or default_loader()
+    return _iter_documents(
+        path,
+        file_type,
+        parser._context(context, values),
+        parser._globals(g),
+        parse,
+        loader,
+        registry if registry is not None else Registry(loader),
+    )
@@ -1,9 +1,29 @@
+import functools
+import itertools
+import math
 import re
-from typing import Any, Dict, Iterable, List, Mapping, Tuple, Type, Union
-
-import jsonpointer
-
-from . import globals
+import time
+from types import CodeType
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    Union,
+)
+
+from . import globals, profiling
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .compact import Compactor
 
 SPECIAL_CHAR = "$"
 VARIABLE_SCOPE = "{}"
@@ -12,11 +32,20 @@ ESCAPE_CHAR = "\\"
 
 NULL = type("NULL", (), {})
 
+_NESTED_EXPRESSION = re.compile(
+    f"(?<!{re.escape(ESCAPE_CHAR)})" + re.escape(SPECIAL_CHAR) + re.escape("(")
+)
 
-def _finder(
+EXPRESSION_CACHE_SIZE = 1024
+EXPRESSION_CACHE_MAX_LENGTH = 4096
+VARIABLE_CACHE_SIZE = 4096
+PARALLEL_THRESHOLD = 1000
+
+
+def _spans(
     string: str, special_char: str, start_char: str, end_char: str, escape_char: str
-) -> Dict[str, Any]:
-    def _find_end() -> Tuple[int, str]:
+) -> Iterator[Tuple[int, int]]:
+    def _find_end() -> int:
         stack = 0
         for relative_index, char in enumerate(string[start + offset :]):
             index = start + relative_index + offset
@@ -25,23 +54,31 @@ def _finder(
             if char == end_char:
                 stack -= 1
             if stack == 0:
-                return index, string[start : index + 1]
+                return index
         raise ValueError
 
     last: int = 0
-    out: Dict[str, Any] = {}
     regex = (
         f"(?<!{re.escape(escape_char)})"
         + re.escape(special_char)
         + re.escape(start_char)
     )
+    offset = len(special_char)
     for start in (m.start() for m in re.finditer(regex, string)):
         if start < last:
             continue
-        offset = len(special_char)
-        last, sub_string = _find_end()
-        out.setdefault(sub_string, sub_string[offset + 1 : -1])
+        last = _find_end()
+        yield start, last + 1
+
 
+def _finder(
+    string: str, special_char: str, start_char: str, end_char: str, escape_char: str
+) -> Dict[str, Any]:
+    offset = len(special_char)
+    out: Dict[str, Any] = {}
+    for start, end in _spans(string, special_char, start_char, end_char, escape_char):
+        sub_string = string[start:end]
+        out.setdefault(sub_string, sub_string[offset + 1 : -1])
     return out
 
 
@@ -57,79 +94,265 @@ def _find_variables(string: str) -> Dict[str, Any]:
     )
 
 
-def _sub(pattern: str, value: Any, string: str) -> Any:
-    if pattern != string:
-        return re.sub(re.escape(pattern), str(_dump_i(value)), string)
-    return _dump_i(value)
+def _expression_spans(string: str) -> Iterator[Tuple[int, int]]:
+    return _spans(
+        string, SPECIAL_CHAR, EXPRESSION_SCOPE[0], EXPRESSION_SCOPE[1], ESCAPE_CHAR
+    )
+
+
+def _variable_spans(string: str) -> Iterator[Tuple[int, int]]:
+    return _spans(
+        string, SPECIAL_CHAR, VARIABLE_SCOPE[0], VARIABLE_SCOPE[1], ESCAPE_CHAR
+    )
 
 
-def _sub_variables(string: str, context: Dict[str, Any], g: Dict[str, Any]) -> str:
-    variables = _find_variables(string)
-    for pattern, variable in variables.items():
-        parts = variable.split(":")
-        if len(parts) == 1:
-            default = NULL
+def _sub(
+    string: str, spans: Iterable[Tuple[int, int]], func: Callable[[str], Any]
+) -> Any:
+    values: Dict[str, str] = {}
+    pieces: List[str] = []
+    last = 0
+    for start, end in spans:
+        pattern = string[start:end]
+        if start == 0 and end == len(string):
+            return _dump_i(func(pattern))
+        if pattern not in values:
+            values[pattern] = str(_dump_i(func(pattern)))
+        pieces.append(string[last:start])
+        pieces.append(values[pattern])
+        last = end
+    if not pieces:
+        return string
+    pieces.append(string[last:])
+    return "".join(pieces)
+
+
+_INVALID_ESCAPE = re.compile("~[^01]|~$")
+_ARRAY_INDEX = re.compile("0|[1-9][0-9]*")
+
+
+@functools.lru_cache(maxsize=VARIABLE_CACHE_SIZE)
+def _variable_path(variable: str) -> Optional[Tuple[Tuple[str, Optional[int]], ...]]:
+    pointer = variable.replace(".", "/")
+    if _INVALID_ESCAPE.search(pointer):
+        return None
+    path = []
+    for part in pointer.split("/"):
+        key = part.replace("~1", "/").replace("~0", "~")
+        path.append((key, int(key) if _ARRAY_INDEX.fullmatch(key) else None))
+    return tuple(path)
+
+
+def _lookup(context: Dict[str, Any], variable: str) -> Any:
+    path = _variable_path(variable)
+    if path is None:
+        return NULL
+    value: Any = context
+    for key, index in path:
+        if isinstance(value, Mapping):
+            value = value.get(key, NULL)
+            if value is NULL:
+                return NULL
+        elif isinstance(value, str):
+            return NULL
+        elif isinstance(value, Sequence):
+            if index is None or index >= len(value):
+                return NULL
+            value = value[index]
+        elif hasattr(value, "__getitem__"):
+            try:
+                value = value[key]
+            except KeyError:
+                return NULL
         else:
-            variable, default = parts[0], ":".join(parts[1:])
-        try:
-            value = (
-                "" if not variable
-                else jsonpointer.resolve_pointer(context, "/" + variable.replace(".", "/"))
-            )
-        except jsonpointer.JsonPointerException as ex:
-            if default is NULL:
-                raise ValueError
-            value = default
-        string = _sub(pattern, _sub_i(value, context, g), string)
-    return string
+            return NULL
+    return value
+
+
+def _compile_source(expression: str) -> CodeType:
+    return compile(f"({expression}\n)", "<expression>", "eval")
+
+
+_compile_cached = functools.lru_cache(maxsize=EXPRESSION_CACHE_SIZE)(_compile_source)
+
+
+def _compile_expression(expression: str) -> CodeType:
+    if len(expression) > EXPRESSION_CACHE_MAX_LENGTH:
+        return _compile_source(expression)
+    return _compile_cached(expression)
+
+
+def _resolve(context: Dict[str, Any], variable: str) -> Any:
+    stats = profiling._active.get()
+    if stats is None:
+        return _lookup(context, variable)
+    start = time.perf_counter()
+    try:
+        return _lookup(context, variable)
+    finally:
+        stats.add_phase("resolve", time.perf_counter() - start)
+
+
+def _evaluate(expression: str, g: Dict[str, Any]) -> Any:
+    stats = profiling._active.get()
+    if stats is None:
+        return eval(_compile_expression(expression), g, {})
+    start = time.perf_counter()
+    try:
+        return eval(_compile_expression(expression), g, {})
+    finally:
+        stats.add_expression(expression, time.perf_counter() - start)
+
+
+def expression_cache_info() -> Any:
+    return _compile_cached.cache_info()
+
+
+def expression_cache_clear() -> None:
+    _compile_cached.cache_clear()
+
+
+def _sub_variable(pattern: str, context: Dict[str, Any], g: Dict[str, Any]) -> Any:
+    variable, separator, default = pattern[len(SPECIAL_CHAR) + 1 : -1].partition(":")
+    value = "" if not variable else _resolve(context, variable)
+    if value is NULL:
+        if not separator:
+            raise ValueError
+        value = default
+    return _sub_i(value, context, g)
+
+
+def _sub_variables(string: str, context: Dict[str, Any], g: Dict[str, Any]) -> Any:
+    return _sub(
+        string,
+        _variable_spans(string),
+        lambda pattern: _sub_variable(pattern, context, g),
+    )
+
+
+def _sub_expression(pattern: str, context: Dict[str, Any], g: Dict[str, Any]) -> Any:
+    expression = _NESTED_EXPRESSION.sub(
+        EXPRESSION_SCOPE[0], pattern[len(SPECIAL_CHAR) + 1 : -1]
+    )
+    expression = _sub_variables(expression, context, g)
+    if not expression:
+        return ""
+    return _evaluate(str(expression), g)
 
 
 def _sub_expressions(string: str, context: Dict[str, Any], g: Dict[str, Any]) -> Any:
-    expressions = _find_expressions(string)
-    for pattern, expression in expressions.items():
-        regex = (
-            f"(?<!{re.escape(ESCAPE_CHAR)})" + re.escape(SPECIAL_CHAR) + re.escape("(")
-        )
-        expression = re.sub(regex, "(", expression)
-        expression = _sub_variables(expression, context, g)
-        if not expression:
-            value = ""
-        else:
-            result: List[Any] = []
-            print(g.keys())
-            exec(f"_result.append({expression})", g, {"_result": result})
-            value = result[0]
-        string = _sub(pattern, value, string)
-    return string
+    return _sub(
+        string,
+        _expression_spans(string),
+        lambda pattern: _sub_expression(pattern, context, g),
+    )
 
 
 def _sub_string(string: str, context: Dict[str, Any], g: Dict[str, Any]) -> Any:
+    if SPECIAL_CHAR not in string:
+        return string
     value = _sub_expressions(string, context, g)
     if not isinstance(value, str):
         return value
     value = _sub_variables(value, context, g)
+    if not isinstance(value, str):
+        return value
     return value.replace(ESCAPE_CHAR + SPECIAL_CHAR, SPECIAL_CHAR)
 
 
+def _copy(value: Any) -> Any:
+    if type(value) is dict:
+        return {key: _copy(item) for key, item in value.items()}
+    if type(value) is list:
+        return [_copy(item) for item in value]
+    return value
+
+
+def _static(value: Any, share: bool) -> Any:
+    return value if share else _copy(value)
+
+
 def _sub_list(
-    iterable: Iterable[Any], context: Dict[str, Any], g: Dict[str, Any]
-) -> List[Any]:
-    return [_sub_i(item, context, g) for item in iterable]
+    iterable: Iterable[Any], context: Dict[str, Any], g: Dict[str, Any], share: bool
+) -> Any:
+    out: Optional[List[Any]] = None if type(iterable) is list else []
+    for index, item in enumerate(iterable):
+        value = _sub_node(item, context, g, share)
+        if out is None:
+            if value is item:
+                continue
+            out = [
+                _static(previous, share)
+                for previous in itertools.islice(iterable, index)
+            ]
+        out.append(_static(item, share) if value is item else value)
+    return iterable if out is None else out
 
 
 def _sub_dict(
-    obj: Mapping[str, Any], context: Dict[str, Any], g: Dict[str, Any]
-) -> Dict[str, Any]:
-    return {key: _sub_i(value, context, g) for key, value in obj.items()}
+    obj: Mapping[str, Any], context: Dict[str, Any], g: Dict[str, Any], share: bool
+) -> Any:
+    out: Optional[Dict[str, Any]] = None if type(obj) is dict else {}
+    for index, (key, value) in enumerate(obj.items()):
+        rendered = _sub_node(value, context, g, share)
+        if out is None:
+            if rendered is value:
+                continue
+            out = {
+                previous_key: _static(previous, share)
+                for previous_key, previous in itertools.islice(obj.items(), index)
+            }
+        out[key] = _static(value, share) if rendered is value else rendered
+    return obj if out is None else out
+
+
+def _sub_node(
+    item: Any, context: Dict[str, Any], g: Dict[str, Any], share: bool
+) -> Any:
+    if isinstance(item, str):
+        return _sub_string(item, context, g)
+    if isinstance(item, Mapping):
+        return _sub_dict(item, context, g, share)
+    if isinstance(item, Iterable):
+        return _sub_list(item, context, g, share)
+    return item
+
+
+def _sub_i(
+    item: Any, context: Dict[str, Any], g: Dict[str, Any], share: bool = False
+) -> Any:
+    value = _sub_node(item, context, g, share)
+    return _static(item, share) if value is item else value
+
 
+def _escape_key(key: Any) -> str:
+    return str(key).replace("~", "~0").replace("/", "~1")
 
-def _sub_i(item: Any, context: Dict[str, Any], g: Dict[str, Any]) -> Any:
+
+def _sub_i_profiled(
+    item: Any,
+    context: Dict[str, Any],
+    g: Dict[str, Any],
+    stats: profiling.Stats,
+    pointer: str,
+) -> Any:
     if isinstance(item, str):
-        return _sub_string(item, context, g)
+        start = time.perf_counter()
+        value = _sub_string(item, context, g)
+        stats.add_path(pointer, time.perf_counter() - start)
+        return value
     if isinstance(item, Mapping):
-        return _sub_dict(item, context, g)
+        return {
+            key: _sub_i_profiled(
+                value, context, g, stats, f"{pointer}/{_escape_key(key)}"
+            )
+            for key, value in item.items()
+        }
     if isinstance(item, Iterable):
-        return _sub_list(item, context, g)
+        return [
+            _sub_i_profiled(value, context, g, stats, f"{pointer}/{index}")
+            for index, value in enumerate(item)
+        ]
     return item
 
 
@@ -144,15 +367,84 @@ def _dump_i(obj: Any) -> Any:
 
 
 def _globals(obj: Union[Dict[str, Any], Type[Any]]) -> Dict[str, Any]:
-    if not isinstance(obj, dict):
-        g = {
-            key: getattr(obj, key)
-            for key in dir(obj)
-            if not key.startswith("_") or key == "__builtins__"
-        }
-    else:
-        g = obj
-    return g
+    if isinstance(obj, dict):
+        return obj
+    if isinstance(obj, type) and issubclass(obj, globals.ExpressionGlobals):
+        return obj.namespace()
+    return globals.build_namespace(obj)
+
+
+def _context(
+    context: Dict[str, Any] = None, values: Dict[str, Any] = None
+) -> Dict[str, Any]:
+    import jsonpointer
+
+    context = context or {}
+    values = values or {}
+    for pointer, value in values.items():
+        jsonpointer.set_pointer(context, "/" + pointer, value)
+    return context
+
+
+_worker: Dict[str, Any] = {}
+
+
+def _init_worker(context: Dict[str, Any], g: Union[Dict[str, Any], Type[Any]]) -> None:
+    _worker["context"] = context
+    _worker["g"] = _globals(g)
+
+
+def _sub_chunk(chunk: List[Any]) -> List[Any]:
+    return [_sub_i(item, _worker["context"], _worker["g"]) for item in chunk]
+
+
+def _sub_parallel(
+    obj: Any,
+    context: Dict[str, Any],
+    g: Union[Dict[str, Any], Type[Any]],
+    workers: int,
+) -> Any:
+    items = list(obj.values()) if isinstance(obj, Mapping) else list(obj)
+    size = math.ceil(len(items) / (workers * 4))
+    chunks = [items[i : i + size] for i in range(0, len(items), size)]
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(
+        workers, initializer=_init_worker, initargs=(context, g)
+    ) as executor:
+        out = [item for chunk in executor.map(_sub_chunk, chunks) for item in chunk]
+    if isinstance(obj, Mapping):
+        return dict(zip(obj.keys(), out))
+    return out
+
+
+def _render(
+    obj: Any,
+    context: Dict[str, Any],
+    g: Union[Dict[str, Any], Type[Any]],
+    workers: int,
+    share: bool,
+) -> Any:
+    stats = profiling._active.get()
+    with profiling.phase("render"):
+        if (
+            workers > 1
+            and isinstance(obj, (Mapping, list, tuple))
+            and len(obj) >= PARALLEL_THRESHOLD
+        ):
+            return _sub_parallel(obj, context, g, workers)
+        if stats is not None:
+            return _sub_i_profiled(obj, context, _globals(g), stats, "")
+        return _sub_i(obj, context, _globals(g), share)
+
+
+def _compact(obj: Any, compact: Union[bool, "Compactor"]) -> Any:
+    if compact is False:
+        return obj
+    from . import compact as compact_output
+
+    with profiling.phase("compact"):
+        return compact_output._compactor(compact).compact(obj)
 
 
 def sub(
@@ -160,9 +452,9 @@ def sub(
     context: Dict[str, Any] = None,
     values: Dict[str, Any] = None,
     g: Union[Dict[str, Any], Type[Any]] = globals.ExpressionGlobals,
+    workers: int = 1,
+    compact: Union[bool, "Compactor"] = False,
+    share: bool = False,
 ) -> Any:
-    context = context or {}
-    values = values or {}
-    for pointer, value in values.items():
-        jsonpointer.set_pointer(context, "/" + pointer, value)
-    return _sub_i(obj, context, _globals(g))
+    context = _context(context, values)
+    return _compact(_render(obj, context, g, workers, share), compact)
@@ -0,0 +1,92 @@
+import contextlib
+import heapq
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+PHASES = (
+    "read",
+    "parse",
+    "compile",
+    "render",
+    "resolve",
+    "evaluate",
+    "compact",
+    "dump",
+)
+
+
+class Stats:
+    def __init__(self, slowest: int = 10) -> None:
+        self.slowest = slowest
+        self.phases: Dict[str, float] = {}
+        self.expressions: Dict[str, List[float]] = {}
+        self._paths: List[Tuple[float, str]] = []
+
+    def add_phase(self, name: str, seconds: float) -> None:
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def add_expression(self, expression: str, seconds: float) -> None:
+        self.add_phase("evaluate", seconds)
+        entry = self.expressions.setdefault(expression, [0, 0.0])
+        entry[0] += 1
+        entry[1] += seconds
+
+    def add_path(self, pointer: str, seconds: float) -> None:
+        if len(self._paths) < self.slowest:
+            heapq.heappush(self._paths, (seconds, pointer))
+        elif seconds > self._paths[0][0]:
+            heapq.heapreplace(self._paths, (seconds, pointer))
+
+    @property
+    def slowest_paths(self) -> List[Tuple[str, float]]:
+        return [
+            (pointer, seconds) for seconds, pointer in sorted(self._paths, reverse=True)
+        ]
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "phases": {
+                name: self.phases[name] for name in PHASES if name in self.phases
+            },
+            "expressions": {
+                expression: {"count": int(count), "seconds": seconds}
+                for expression, (count, seconds) in sorted(
+                    self.expressions.items(), key=lambda item: -item[1][1]
+                )
+            },
+            "slowest_paths": [
+                {"path": pointer, "seconds": seconds}
+                for pointer, seconds in self.slowest_paths
+            ],
+        }
+
+
+_active: ContextVar[Optional[Stats]] = ContextVar("yamlscript_stats", default=None)
+
+
+def current() -> Optional[Stats]:
+    return _active.get()
+
+
+@contextlib.contextmanager
+def profile(stats: Optional[Stats] = None) -> Iterator[Stats]:
+    stats = stats if stats is not None else Stats()
+    token = _active.set(stats)
+    try:
+        yield stats
+    finally:
+        _active.reset(token)
+
+
+@contextlib.contextmanager
+def phase(name: str) -> Iterator[None]:
+    stats = _active.get()
+    if stats is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.add_phase(name, time.perf_counter() - start)
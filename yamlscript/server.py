@@ -0,0 +1,230 @@
+import collections
+import json
+import os
+import pathlib
+import socket
+import socketserver
+import sys
+import threading
+from typing import IO, Any, Dict, Optional, Tuple, Type, Union
+
+from . import compiler, globals, loader, parser
+
+DEFAULT_MAX_TEMPLATES = 256
+
+_Entry = Tuple[Any, Any, compiler.CompiledTemplate]
+
+
+class RenderError(Exception):
+    def __init__(self, type: str, message: str) -> None:
+        super().__init__(f"{type}: {message}" if message else type)
+        self.type = type
+        self.message = message
+
+
+class Server:
+    def __init__(
+        self,
+        g: Union[Dict[str, Any], Type[Any]] = globals.ExpressionGlobals,
+        yaml_loader: Optional[Type[Any]] = None,
+        max_templates: int = DEFAULT_MAX_TEMPLATES,
+    ) -> None:
+        self._g = parser._globals(g)
+        self._loader = yaml_loader
+        self.max_templates = max_templates
+        self._templates: "collections.OrderedDict[Any, _Entry]" = (
+            collections.OrderedDict()
+        )
+        self._lock = threading.Lock()
+        self._registry = loader.Registry(yaml_loader)
+        self.hits = 0
+        self.misses = 0
+
+    def _cached(self, key: Any, stamp: Any) -> Optional[_Entry]:
+        with self._lock:
+            entry = self._templates.get(key)
+            if entry is None or entry[0] != stamp:
+                self.misses += 1
+                return None
+            self._templates.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def _store(self, key: Any, stamp: Any, content: Any) -> _Entry:
+        entry = (stamp, content, compiler.compile(content, self._g, share=True))
+        with self._lock:
+            self._templates[key] = entry
+            self._templates.move_to_end(key)
+            while len(self._templates) > self.max_templates:
+                self._templates.popitem(last=False)
+        return entry
+
+    def _template(self, request: Dict[str, Any]) -> Tuple[Any, _Entry]:
+        file_type = request.get("file_type")
+        yaml_loader = self._loader or loader.default_loader()
+        if "path" in request:
+            path = loader._path(request["path"])
+            file_type = loader._file_type(path, file_type)
+            stat = path.stat()
+            key = (str(path), file_type)
+            stamp = (stat.st_mtime_ns, stat.st_size)
+            entry = self._cached(key, stamp)
+            if entry is None:
+                content = loader._read(path.read_text(), file_type, yaml_loader)
+                entry = self._store(key, stamp, content)
+            return path, entry
+        if "document" not in request:
+            raise ValueError("request needs a path or a document")
+        document = request["document"]
+        if not isinstance(document, str):
+            template = compiler.compile(document, self._g, share=True)
+            return None, (None, document, template)
+        file_type = file_type or "yaml"
+        if file_type not in ("json", "yaml", "yml"):
+            raise NotImplementedError
+        key = (document, file_type)
+        entry = self._cached(key, None)
+        if entry is None:
+            entry = self._store(
+                key, None, loader._read(document, file_type, yaml_loader)
+            )
+        return None, entry
+
+    def render(self, request: Dict[str, Any]) -> Any:
+        path, (_, content, template) = self._template(request)
+        if not request.get("parse", True):
+            return content
+        context = parser._context(request.get("context"), request.get("values"))
+        with loader._including(self._registry, context, self._g, path):
+            return template.render(context)
+
+    def handle(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        return json.loads(self._respond(request))
+
+    def _respond(self, request: Dict[str, Any]) -> str:
+        response: Dict[str, Any] = {}
+        if "id" in request:
+            response["id"] = request["id"]
+        try:
+            return json.dumps(dict(response, result=self.render(request)))
+        except Exception as ex:
+            response["error"] = {"type": type(ex).__name__, "message": str(ex)}
+        return json.dumps(response)
+
+    def handle_line(self, line: str) -> str:
+        try:
+            request = json.loads(line)
+        except ValueError as ex:
+            error = {"type": type(ex).__name__, "message": str(ex)}
+            return json.dumps({"error": error})
+        if not isinstance(request, dict):
+            error = {"type": "TypeError", "message": "request must be an object"}
+            return json.dumps({"error": error})
+        return self._respond(request)
+
+    def serve_stream(self, reader: IO[str], writer: IO[str]) -> None:
+        for line in reader:
+            if line.strip():
+                writer.write(self.handle_line(line) + "\n")
+                writer.flush()
+
+    def listen(self, path: Union[pathlib.Path, str]) -> socketserver.BaseServer:
+        server = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self) -> None:
+                for line in self.rfile:
+                    if line.strip():
+                        response = server.handle_line(line.decode())
+                        self.wfile.write(response.encode() + b"\n")
+                        self.wfile.flush()
+
+        class UnixServer(socketserver.ThreadingUnixStreamServer):
+            daemon_threads = True
+
+            def server_close(self) -> None:
+                super().server_close()
+                if os.path.exists(path):
+                    os.unlink(path)
+
+        return UnixServer(str(path), Handler)
+
+
+def serve(
+    path: Union[pathlib.Path, str, None] = None,
+    g: Union[Dict[str, Any], Type[Any]] = globals.ExpressionGlobals,
+    reader: Optional[IO[str]] = None,
+    writer: Optional[IO[str]] = None,
+) -> None:
+    server = Server(g)
+    if path is None:
+        server.serve_stream(reader or sys.stdin, writer or sys.stdout)
+        return
+    with server.listen(path) as unix_server:
+        try:
+            unix_server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+
+class Client:
+    def __init__(self, reader: IO[str], writer: IO[str]) -> None:
+        self._reader = reader
+        self._writer = writer
+        self._socket: Optional[socket.socket] = None
+
+    @classmethod
+    def connect(cls, path: Union[pathlib.Path, str]) -> "Client":
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(str(path))
+        stream = sock.makefile("rw", encoding="utf-8", newline="\n")
+        client = cls(stream, stream)
+        client._socket = sock
+        return client
+
+    def request(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        self._writer.write(json.dumps(request) + "\n")
+        self._writer.flush()
+        line = self._reader.readline()
+        if not line:
+            raise ConnectionError("server closed the connection")
+        response: Dict[str, Any] = json.loads(line)
+        return response
+
+    def render(
+        self,
+        path: Union[pathlib.Path, str, None] = None,
+        document: Any = None,
+        context: Optional[Dict[str, Any]] = None,
+        values: Optional[Dict[str, Any]] = None,
+        file_type: Optional[str] = None,
+        parse: bool = True,
+    ) -> Any:
+        request: Dict[str, Any] = {"parse": parse}
+        if path is not None:
+            request["path"] = str(path)
+        else:
+            request["document"] = document
+        for name, value in (
+            ("context", context),
+            ("values", values),
+            ("file_type", file_type),
+        ):
+            if value is not None:
+                request[name] = value
+        response = self.request(request)
+        if "error" in response:
+            raise RenderError(response["error"]["type"], response["error"]["message"])
+        return response["result"]
+
+    def close(self) -> None:
+        if self._socket is not None:
+            self._reader.close()
+            self._socket.close()
+            self._socket = None
+
+    def __enter__(self) -> "Client":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
@@ -0,0 +1,116 @@
+import collections.abc
+import json
+import time
+from typing import IO, Any, Dict, Iterable, Iterator, Optional, Type, Union
+
+from . import compiler, globals, parser, profiling
+
+
+def _key(key: Any) -> str:
+    if isinstance(key, str):
+        return json.dumps(key)
+    if key is None or isinstance(key, (bool, int, float)):
+        return json.dumps(json.dumps(key))
+    raise TypeError(
+        f"keys must be str, int, float, bool or None, not {type(key).__name__}"
+    )
+
+
+def _child(stats: Optional[profiling.Stats], pointer: str, key: Any) -> str:
+    return pointer if stats is None else f"{pointer}/{parser._escape_key(key)}"
+
+
+def _timed(
+    stats: Optional[profiling.Stats], pointer: str, render: Any, *args: Any
+) -> Any:
+    if stats is None:
+        return render(*args)
+    start = time.perf_counter()
+    value = render(*args)
+    seconds = time.perf_counter() - start
+    stats.add_phase("render", seconds)
+    stats.add_path(pointer, seconds)
+    return value
+
+
+def _iter_mapping(items: Iterable[Any], walk: Any) -> Iterator[str]:
+    separator = "{"
+    for key, value in items:
+        yield f"{separator}{_key(key)}: "
+        yield from walk(key, value)
+        separator = ", "
+    yield "}" if separator == ", " else "{}"
+
+
+def _iter_sequence(items: Iterable[Any], walk: Any) -> Iterator[str]:
+    separator = "["
+    for index, value in enumerate(items):
+        yield separator
+        yield from walk(index, value)
+        separator = ", "
+    yield "]" if separator == ", " else "[]"
+
+
+def _iter_item(
+    item: Any,
+    context: Dict[str, Any],
+    g: Dict[str, Any],
+    stats: Optional[profiling.Stats],
+    pointer: str,
+) -> Iterator[str]:
+    def walk(key: Any, value: Any) -> Iterator[str]:
+        return _iter_item(value, context, g, stats, _child(stats, pointer, key))
+
+    if isinstance(item, str):
+        yield json.dumps(_timed(stats, pointer, parser._sub_string, item, context, g))
+    elif isinstance(item, collections.abc.Mapping):
+        yield from _iter_mapping(item.items(), walk)
+    elif isinstance(item, collections.abc.Iterable):
+        yield from _iter_sequence(item, walk)
+    else:
+        yield json.dumps(item)
+
+
+def _iter_node(
+    node: Any,
+    context: Dict[str, Any],
+    g: Dict[str, Any],
+    stats: Optional[profiling.Stats],
+    pointer: str,
+) -> Iterator[str]:
+    def walk(key: Any, value: Any) -> Iterator[str]:
+        return _iter_node(value, context, g, stats, _child(stats, pointer, key))
+
+    if isinstance(node, compiler._Mapping):
+        yield from _iter_mapping(node.items, walk)
+    elif isinstance(node, compiler._Sequence):
+        yield from _iter_sequence(node.items, walk)
+    elif isinstance(node, compiler._Static):
+        yield json.dumps(node.value)
+    elif isinstance(node, compiler._String):
+        yield json.dumps(_timed(stats, pointer, node.render, context, g))
+    else:
+        yield json.dumps(node.render(context, g))
+
+
+def iter_json(
+    obj: Any,
+    context: Dict[str, Any] = None,
+    values: Dict[str, Any] = None,
+    g: Union[Dict[str, Any], Type[Any]] = globals.ExpressionGlobals,
+) -> Iterator[str]:
+    context = parser._context(context, values)
+    stats = profiling._active.get()
+    if isinstance(obj, compiler.CompiledTemplate):
+        return _iter_node(obj._root, context, obj._g, stats, "")
+    return _iter_item(obj, context, parser._globals(g), stats, "")
+
+
+def dump(
+    obj: Any,
+    fp: IO[str],
+    context: Dict[str, Any] = None,
+    values: Dict[str, Any] = None,
+    g: Union[Dict[str, Any], Type[Any]] = globals.ExpressionGlobals,
+) -> None:
+    fp.writelines(iter_json(obj, context, values, g))
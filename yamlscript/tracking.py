@@ -0,0 +1,187 @@
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Set,
+    Tuple,
+    Type,
+    Union,
+)
+
+from . import compiler, globals, parser
+
+_Path = Tuple[Any, ...]
+
+_ROOT: _Path = ()
+
+
+class _Trie:
+
+    __slots__ = ("children", "leaves")
+
+    def __init__(self) -> None:
+        self.children: Dict[str, "_Trie"] = {}
+        self.leaves: List[int] = []
+
+    def add(self, path: _Path, leaf: int) -> None:
+        node = self
+        for key in path:
+            node = node.children.setdefault(key, _Trie())
+        node.leaves.append(leaf)
+
+    def all(self) -> Iterator[int]:
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            yield from node.leaves
+            stack.extend(node.children.values())
+
+    def find(self, path: _Path) -> Iterator[int]:
+        node = self
+        yield from node.leaves
+        for key in path:
+            if key not in node.children:
+                return
+            node = node.children[key]
+            yield from node.leaves
+        yield from (leaf for child in node.children.values() for leaf in child.all())
+
+
+def _leaves(node: Any, path: _Path) -> Iterator[Tuple[_Path, Any]]:
+    if isinstance(node, compiler._String):
+        yield path, node
+    elif isinstance(node, compiler._Mapping):
+        for key, item in node.items:
+            yield from _leaves(item, path + (key,))
+    elif isinstance(node, compiler._Sequence):
+        for index, item in enumerate(node.items):
+            yield from _leaves(item, path + (index,))
+
+
+def _parts_dependencies(parts: Iterable[Any], out: Set[_Path]) -> None:
+    for part in parts:
+        if not isinstance(part, compiler._Variable):
+            continue
+        if all(isinstance(item, str) for item in part.path):
+            variable = "".join(part.path)
+            path = parser._variable_path(variable) if variable else ()
+            if path:
+                out.add(tuple(key for key, _ in path))
+        else:
+            out.add(_ROOT)
+        if part.default is not None:
+            _parts_dependencies(part.default, out)
+
+
+def _dependencies(node: Any) -> Set[_Path]:
+    if node.expressions:
+        return {_ROOT}
+    out: Set[_Path] = set()
+    _parts_dependencies(node.parts, out)
+    return out
+
+
+def _has_template(value: Any) -> bool:
+    if isinstance(value, str):
+        return parser.SPECIAL_CHAR in value
+    if isinstance(value, Mapping):
+        return any(_has_template(item) for item in value.values())
+    if isinstance(value, Iterable):
+        return any(_has_template(item) for item in value)
+    return False
+
+
+def _pointer(path: _Path) -> str:
+    return "".join("/" + parser._escape_key(key) for key in path)
+
+
+def _get(document: Any, path: _Path) -> Any:
+    for key in path:
+        document = document[key]
+    return document
+
+
+def _assign(document: Any, path: _Path, value: Any, copied: Set[int]) -> Any:
+    if not path:
+        return value
+    if id(document) not in copied:
+        document = dict(document) if isinstance(document, dict) else list(document)
+        copied.add(id(document))
+    parent = document
+    for key in path[:-1]:
+        child = parent[key]
+        if id(child) not in copied:
+            child = dict(child) if isinstance(child, dict) else list(child)
+            copied.add(id(child))
+            parent[key] = child
+        parent = child
+    parent[path[-1]] = value
+    return document
+
+
+class TrackedDocument:
+    def __init__(
+        self,
+        template: compiler.CompiledTemplate,
+        context: Dict[str, Any],
+        document: Any,
+    ) -> None:
+        self.template = template
+        self.context = context
+        self.document = document
+        self._leaves = list(_leaves(template._root, _ROOT))
+        self._index()
+
+    def _index(self) -> None:
+        self._trie = _Trie()
+        for leaf, (_, node) in enumerate(self._leaves):
+            for path in _dependencies(node):
+                value = parser._lookup(self.context, _pointer(path)[1:])
+                if path and _has_template(value):
+                    path = _ROOT
+                self._trie.add(path, leaf)
+
+    def update(self, values: Dict[str, Any]) -> Tuple[Any, List[str]]:
+        import jsonpointer
+
+        parser._context(self.context, values)
+        if any(_has_template(value) for value in values.values()):
+            affected: Iterable[int] = range(len(self._leaves))
+            self._index()
+        else:
+            found: Set[int] = set()
+            for pointer in values:
+                found.update(
+                    self._trie.find(tuple(jsonpointer.JsonPointer("/" + pointer).parts))
+                )
+            affected = sorted(found)
+
+        document = self.document
+        copied: Set[int] = set()
+        diff: List[str] = []
+        for leaf in affected:
+            path, node = self._leaves[leaf]
+            value = node.render(self.context, self.template._g)
+            if value != _get(document, path):
+                document = _assign(document, path, value, copied)
+                diff.append(_pointer(path))
+        self.document = document
+        return document, diff
+
+
+def track(
+    template: Any,
+    context: Optional[Dict[str, Any]] = None,
+    values: Optional[Dict[str, Any]] = None,
+    g: Union[Dict[str, Any], Type[Any]] = globals.ExpressionGlobals,
+) -> TrackedDocument:
+    if not isinstance(template, compiler.CompiledTemplate):
+        template = compiler.compile(template, g)
+    context = parser._context(context, values)
+    return TrackedDocument(
+        template, context, template._root.render(context, template._g)
+    )